@@ -0,0 +1,63 @@
+"""
+Ahead-of-time compilation for Motion3D Transformer
+Exports fixed-shape models with torch.export and caches AOTInductor packages
+"""
+
+import os
+import torch
+import torch.nn as nn
+from typing import Callable, Optional, Tuple
+
+def is_aot_available() -> bool:
+    """Check if torch.export and AOTInductor packaging are available"""
+    inductor = getattr(torch, "_inductor", None)
+    return (
+        hasattr(torch, "export")
+        and hasattr(inductor, "aoti_compile_and_package")
+        and hasattr(inductor, "aoti_load_package")
+    )
+
+def compile_package(model: nn.Module, example_inputs: Tuple[torch.Tensor, ...], package_path: str):
+    """
+    Export a model for fixed input shapes and compile it into an AOTInductor package
+    
+    Args:
+        model: Model to export
+        example_inputs: Inputs with the exact shapes, dtypes and strides used at runtime
+        package_path: Output .pt2 path
+    """
+    exported = torch.export.export(model, example_inputs)
+    torch._inductor.aoti_compile_and_package(exported, package_path=package_path)
+
+def load_aot_model(model: nn.Module, package_path: str,
+                   example_inputs: Tuple[torch.Tensor, ...]) -> Optional[Callable]:
+    """
+    Load an AOT-compiled model, exporting and caching the package if missing
+    
+    Args:
+        model: Model to export if no package is cached
+        package_path: Path of the cached .pt2 package
+        example_inputs: Inputs the package is specialized for
+        
+    Returns:
+        Compiled callable with the model's API, or None if AOT compilation is not available
+    """
+    if not is_aot_available():
+        return None
+        
+    if not os.path.exists(package_path):
+        print(f"🔧 AOT-compiling model to {package_path}...")
+        try:
+            compile_package(model, example_inputs, package_path)
+        except Exception as e:
+            print(f"⚠️ Failed to AOT-compile model: {e}")
+            return None
+            
+    try:
+        compiled = torch._inductor.aoti_load_package(package_path)
+    except Exception as e:
+        print(f"⚠️ Failed to load AOT package: {e}")
+        return None
+        
+    print(f"✅ Loaded AOT package from {package_path}")
+    return compiled
\ No newline at end of file
@@ -5,18 +5,31 @@ Provides REST API endpoints for motion transfer
 
 import os
 import io
+import sys
+import time
 import uuid
+import asyncio
+import hashlib
+from collections import OrderedDict
 from typing import Dict, Optional, List
+from pathlib import Path
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import uvicorn
+import aiofiles
 import tempfile
 import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from .predictor import Motion3DPredictor
+from ..models.model_loader import get_model_manager
+from .worker import init_worker, run_motion_transfer
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -25,18 +38,27 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:5173"],  # React dev servers
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Model manager used for listing models; this process loads no model weights itself
+model_manager = None
+
+# Model used by /generate when none is requested, set via /model/switch
+active_model_name: Optional[str] = None
 
-# Global predictor instance
+# Predictor for /benchmark, created on first use so the API process doesn't hold a
+# second GPU copy of the models the worker already serves; creating, switching and
+# benchmarking hold _predictor_lock, since benchmarks run in a worker thread and
+# share the predictor's active model and staging buffer
 predictor = None
-current_tasks = {}
+_predictor_lock = asyncio.Lock()
+
+# Process pool running motion transfer jobs; it owns its own CUDA context
+INFERENCE_WORKERS = 1
+executor = None
+
+# Task status, bounded LRU; all mutations go through set_task/update_task
+MAX_TASKS = 256
+current_tasks = OrderedDict()
+_tasks_lock = asyncio.Lock()
 
 class MotionRequest(BaseModel):
     """Request model for motion generation"""
@@ -68,27 +90,279 @@ class BenchmarkResult(BaseModel):
 # Storage for uploaded files and results
 UPLOAD_DIR = "uploads"
 RESULTS_DIR = "results"
+CACHE_DIR = os.path.join(RESULTS_DIR, "cache")
+UPLOAD_DIR_P = Path(UPLOAD_DIR)
+RESULTS_DIR_P = Path(RESULTS_DIR)
+CACHE_DIR_P = Path(CACHE_DIR)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(RESULTS_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 200 * 1024 * 1024))
+
+# Whole request bodies carry two uploads plus multipart framing
+MAX_REQUEST_BYTES = int(os.environ.get("MAX_REQUEST_BYTES", 2 * MAX_UPLOAD_BYTES + UPLOAD_CHUNK_SIZE))
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject oversize request bodies before they are parsed or spooled to disk
+    
+    Requests declaring a too-large Content-Length are refused without reading
+    the body; bodies without one (chunked) are counted as they stream in.
+    """
+    
+    def __init__(self, app, max_bytes: Optional[int] = None):
+        """
+        Args:
+            app: ASGI app to wrap
+            max_bytes: Maximum body size (optional, uses MAX_REQUEST_BYTES if None)
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+        
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+            
+        max_bytes = self.max_bytes if self.max_bytes is not None else MAX_REQUEST_BYTES
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and int(content_length) > max_bytes:
+            response = JSONResponse({"detail": "Request body too large"}, status_code=413)
+            await response(scope, receive, send)
+            return
+            
+        received_bytes = 0
+        
+        async def limited_receive():
+            nonlocal received_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                received_bytes += len(message.get("body", b""))
+                if received_bytes > max_bytes:
+                    # FastAPI re-raises HTTPExceptions from body parsing as-is
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+            
+        await self.app(scope, limited_receive, send)
+
+# Size limit sits inside CORS so 413 responses still carry CORS headers
+app.add_middleware(RequestSizeLimitMiddleware)
+
+# Configure CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000", "http://localhost:5173"],  # React dev servers
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# LRU cache of generated videos keyed by input content hash, model name and checkpoint
+PREDICTION_CACHE_SIZE = 32
+PREDICTION_CACHE = OrderedDict()
+
+# Bump when generated videos change for the same inputs and weights (e.g. output
+# mapping or encoding), so videos cached by earlier versions are no longer served
+PREDICTION_FORMAT_VERSION = 2
+
+async def save_upload(upload: UploadFile, path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """
+    Stream an uploaded file to disk without blocking the event loop
+    
+    Args:
+        upload: Uploaded file
+        path: Destination path
+        max_bytes: Maximum accepted file size
+        
+    Returns:
+        Hex digest of the file contents
+    """
+    # Reject early when the size is already known
+    size = getattr(upload, "size", None)
+    if size is not None and size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"{upload.filename} is too large")
+        
+    digest = hashlib.blake2b(digest_size=16)
+    total_bytes = 0
+    
+    # Reuse one buffer for every chunk instead of allocating bytes per read;
+    # SpooledTemporaryFile only has readinto on Python 3.11+
+    buffer = bytearray(UPLOAD_CHUNK_SIZE)
+    view = memoryview(buffer)
+    use_readinto = hasattr(upload.file, "readinto")
+    try:
+        async with aiofiles.open(path, "wb") as f:
+            while True:
+                if use_readinto:
+                    num_bytes = await run_in_threadpool(upload.file.readinto, buffer)
+                    chunk = view[:num_bytes]
+                else:
+                    chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                    num_bytes = len(chunk)
+                if not num_bytes:
+                    break
+                    
+                total_bytes += num_bytes
+                if total_bytes > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"{upload.filename} is too large")
+                    
+                digest.update(chunk)
+                await f.write(chunk)
+    except HTTPException:
+        os.remove(path)
+        raise
+    return digest.hexdigest()
+
+def get_prediction_cache_key(source_digest: str, driving_digest: str, model_name: str) -> Optional[str]:
+    """
+    Build prediction cache key from input digests, model and checkpoint
+    
+    Args:
+        source_digest: Digest of the source image
+        driving_digest: Digest of the driving video
+        model_name: Model generating the video
+        
+    Returns:
+        Cache key, or None if the model has no checkpoint and its output can't be reused
+    """
+    fingerprint = get_model_manager().get_checkpoint_fingerprint(model_name)
+    if fingerprint is None:
+        # Randomly initialized weights differ every run, so there is nothing to cache
+        return None
+    return hashlib.blake2b(
+        f"{PREDICTION_FORMAT_VERSION}:{source_digest}:{driving_digest}:{model_name}:{fingerprint}".encode(),
+        digest_size=16
+    ).hexdigest()
+
+def get_cached_prediction(cache_key: str) -> Optional[str]:
+    """Get cached output path for a key, marking it as recently used"""
+    cached_path = PREDICTION_CACHE.get(cache_key)
+    if cached_path is None:
+        return None
+        
+    if not os.path.exists(cached_path):
+        del PREDICTION_CACHE[cache_key]
+        return None
+        
+    PREDICTION_CACHE.move_to_end(cache_key)
+    return cached_path
+
+def evict_predictions():
+    """Remove least recently used cache entries beyond PREDICTION_CACHE_SIZE"""
+    while len(PREDICTION_CACHE) > PREDICTION_CACHE_SIZE:
+        _, evicted_path = PREDICTION_CACHE.popitem(last=False)
+        if os.path.exists(evicted_path):
+            os.remove(evicted_path)
+
+async def cache_prediction(cache_key: str, output_path: str):
+    """Store a copy of a generated video in the prediction cache"""
+    cached_path = str(CACHE_DIR_P / f"{cache_key}.mp4")
+    await run_in_threadpool(shutil.copyfile, output_path, cached_path)
+    PREDICTION_CACHE[cache_key] = cached_path
+    PREDICTION_CACHE.move_to_end(cache_key)
+    evict_predictions()
+
+def load_prediction_cache():
+    """Rebuild the prediction cache index from files left in CACHE_DIR by earlier runs"""
+    PREDICTION_CACHE.clear()
+    
+    # Oldest first, so the most recently written files end up most recently used
+    cached_files = sorted(CACHE_DIR_P.glob("*.mp4"), key=lambda p: p.stat().st_mtime)
+    for cached_path in cached_files:
+        PREDICTION_CACHE[cached_path.stem] = str(cached_path)
+    evict_predictions()
+
+# Result files older than this are removed by the periodic sweeper
+RESULT_TTL_SECONDS = 24 * 60 * 60
+SWEEP_INTERVAL_SECONDS = 10 * 60
+
+def remove_task_files(task: Dict):
+    """Remove the output file owned by a task, if any"""
+    output_path = task.get("output_path")
+    if output_path and os.path.exists(output_path):
+        os.remove(output_path)
+
+async def set_task(task_id: str, task: Dict):
+    """Replace a task's status, evicting the oldest tasks beyond MAX_TASKS"""
+    async with _tasks_lock:
+        current_tasks[task_id] = task
+        current_tasks.move_to_end(task_id)
+        
+        while len(current_tasks) > MAX_TASKS:
+            _, evicted_task = current_tasks.popitem(last=False)
+            remove_task_files(evicted_task)
+
+async def update_task(task_id: str, **fields):
+    """Update fields of a task's status"""
+    async with _tasks_lock:
+        if task_id in current_tasks:
+            current_tasks[task_id].update(fields)
+
+async def remove_stale_results(cutoff: float):
+    """Delete result files last modified before cutoff, along with their tasks"""
+    async with _tasks_lock:
+        for entry in os.scandir(RESULTS_DIR):
+            if not entry.is_file() or entry.stat().st_mtime >= cutoff:
+                continue
+                
+            os.remove(entry.path)
+            stale_ids = [
+                task_id for task_id, task in current_tasks.items()
+                if task.get("output_path") == entry.path
+            ]
+            for task_id in stale_ids:
+                del current_tasks[task_id]
+
+async def sweep_stale_results():
+    """Periodically delete result files older than RESULT_TTL_SECONDS"""
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+        await remove_stale_results(time.time() - RESULT_TTL_SECONDS)
+
+def create_executor() -> ProcessPoolExecutor:
+    """Create the process pool that runs motion transfer jobs"""
+    # CUDA can't be re-initialized in a forked child, so the workers are spawned
+    return ProcessPoolExecutor(
+        max_workers=INFERENCE_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker
+    )
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize predictor on startup"""
-    global predictor
+    """Pick the default model and start the inference workers on startup"""
+    global model_manager, active_model_name, executor
     print("🚀 Starting Motion3D Transformer API...")
     
-    # Try to load default model
-    try:
-        predictor = Motion3DPredictor("motion_clone")
-        print("✅ MotionClone model loaded successfully")
-    except Exception as e:
-        print(f"⚠️ Failed to load MotionClone: {e}")
-        try:
-            predictor = Motion3DPredictor("fomm")
-            print("✅ FOMM model loaded as fallback")
-        except Exception as e2:
-            print(f"❌ Failed to load any model: {e2}")
-            predictor = None
+    # Only the worker loads models for generation; this process just checks which exist
+    model_manager = get_model_manager()
+    available_models = model_manager.get_available_models()
+    if "motion_clone" in available_models:
+        active_model_name = "motion_clone"
+        print("✅ MotionClone model available")
+    elif "fomm" in available_models:
+        active_model_name = "fomm"
+        print("✅ FOMM model available as fallback")
+    else:
+        print("❌ No models found. Run scripts/download_models.py first.")
+        active_model_name = None
+        
+    executor = create_executor()
+    
+    load_prediction_cache()
+    asyncio.create_task(sweep_stale_results())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop inference workers on shutdown"""
+    if executor is not None:
+        # cancel_futures is only available on Python 3.9+
+        if sys.version_info >= (3, 9):
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            executor.shutdown(wait=False)
 
 @app.get("/")
 async def root():
@@ -104,18 +378,17 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "predictor_loaded": predictor is not None,
-        "device": predictor.device if predictor else None
+        "predictor_loaded": active_model_name is not None,
+        "device": model_manager.device if model_manager else None
     }
 
 @app.get("/models", response_model=List[ModelInfo])
 async def get_available_models():
     """Get list of available models"""
-    if not predictor:
+    if not active_model_name:
         raise HTTPException(status_code=503, detail="No models loaded")
         
     models = []
-    model_manager = predictor.model_manager
     available_models = model_manager.get_available_models()
     
     for model_name in ["motion_clone", "fomm"]:
@@ -133,34 +406,40 @@ async def get_available_models():
 @app.get("/model/current")
 async def get_current_model():
     """Get information about currently loaded model"""
-    if not predictor:
+    if not active_model_name:
         raise HTTPException(status_code=503, detail="No models loaded")
         
-    return predictor.get_model_info()
+    # Parameter counts are only known here once /benchmark has loaded the model
+    if predictor is not None and predictor.model_name == active_model_name:
+        return predictor.get_model_info()
+    return {
+        "model_name": active_model_name,
+        "device": str(model_manager.device)
+    }
 
 @app.post("/model/switch/{model_name}")
 async def switch_model(model_name: str):
     """Switch to a different model"""
-    if not predictor:
+    global active_model_name
+    if not active_model_name:
         raise HTTPException(status_code=503, detail="No models loaded")
         
     if model_name not in ["motion_clone", "fomm"]:
         raise HTTPException(status_code=400, detail="Invalid model name")
         
-    try:
-        predictor.model_manager.set_current_model(model_name)
-        predictor.model = predictor.model_manager.get_current_model()
-        predictor.model_name = model_name
-        return {"message": f"Switched to {model_name}"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # The worker loads the model on its next job; nothing is loaded here
+    if model_name not in model_manager.get_available_models():
+        raise HTTPException(status_code=500, detail=f"Model {model_name} not found")
+        
+    active_model_name = model_name
+    return {"message": f"Switched to {model_name}"}
 
 @app.post("/generate", response_model=MotionResponse)
 async def generate_motion(
     background_tasks: BackgroundTasks,
     source_image: UploadFile = File(...),
     driving_video: UploadFile = File(...),
-    model_name: str = "motion_clone"
+    model_name: Optional[str] = None
 ):
     """
     Generate motion transfer from uploaded files
@@ -168,35 +447,62 @@ async def generate_motion(
     Args:
         source_image: Source image file
         driving_video: Driving video file  
-        model_name: Model to use ("motion_clone" or "fomm")
+        model_name: Model to use ("motion_clone" or "fomm"), defaults to the model set via /model/switch
         
     Returns:
         Task ID and status
     """
-    if not predictor:
+    if not active_model_name:
         raise HTTPException(status_code=503, detail="No models loaded")
+        
+    # The worker runs whichever model is requested; default to the active one
+    if model_name is None:
+        model_name = active_model_name
     
     # Generate unique task ID
     task_id = str(uuid.uuid4())
     
-    # Validate files
-    if not source_image.content_type.startswith('image/'):
+    # Validate files before any disk IO
+    if not (source_image.content_type or "").startswith('image/'):
         raise HTTPException(status_code=400, detail="Source file must be an image")
         
-    if not driving_video.content_type.startswith('video/'):
+    if not (driving_video.content_type or "").startswith('video/'):
         raise HTTPException(status_code=400, detail="Driving file must be a video")
     
     # Save uploaded files temporarily
-    source_path = os.path.join(UPLOAD_DIR, f"{task_id}_source{os.path.splitext(source_image.filename)[1]}")
-    driving_path = os.path.join(UPLOAD_DIR, f"{task_id}_driving{os.path.splitext(driving_video.filename)[1]}")
+    source_path = str(UPLOAD_DIR_P / f"{task_id}_source{Path(source_image.filename).suffix}")
+    driving_path = str(UPLOAD_DIR_P / f"{task_id}_driving{Path(driving_video.filename).suffix}")
     
-    with open(source_path, "wb") as f:
-        shutil.copyfileobj(source_image.file, f)
-    with open(driving_path, "wb") as f:
-        shutil.copyfileobj(driving_video.file, f)
+    source_digest = await save_upload(source_image, source_path)
+    try:
+        driving_digest = await save_upload(driving_video, driving_path)
+    except HTTPException:
+        os.remove(source_path)
+        raise
+    
+    # Serve identical requests from the prediction cache
+    cache_key = get_prediction_cache_key(source_digest, driving_digest, model_name)
+    cached_path = get_cached_prediction(cache_key) if cache_key is not None else None
+    if cached_path is not None:
+        final_path = str(RESULTS_DIR_P / f"{task_id}.mp4")
+        await run_in_threadpool(shutil.copyfile, cached_path, final_path)
+        
+        os.remove(source_path)
+        os.remove(driving_path)
+        
+        await set_task(task_id, {
+            "status": "completed",
+            "progress": 100,
+            "output_path": final_path
+        })
+        return MotionResponse(
+            task_id=task_id,
+            status="completed",
+            output_path=final_path
+        )
     
     # Initialize task status
-    current_tasks[task_id] = {"status": "processing", "progress": 0}
+    await set_task(task_id, {"status": "processing", "progress": 0})
     
     # Start background processing
     background_tasks.add_task(
@@ -204,7 +510,8 @@ async def generate_motion(
         task_id,
         source_path,
         driving_path,
-        model_name
+        model_name,
+        cache_key
     )
     
     return MotionResponse(
@@ -212,52 +519,62 @@ async def generate_motion(
         status="processing"
     )
 
-async def process_motion_transfer(task_id: str, source_path: str, driving_path: str, model_name: str):
+async def process_motion_transfer(task_id: str, source_path: str, driving_path: str, model_name: str,
+                                  cache_key: Optional[str] = None):
     """
     Background task for processing motion transfer
     """
+    global executor
     try:
         # Update task status
-        current_tasks[task_id]["status"] = "processing"
-        current_tasks[task_id]["progress"] = 25
+        await update_task(task_id, status="processing", progress=25)
         
         # Generate output path
-        output_path = os.path.join(RESULTS_DIR, f"{task_id}_output.mp4")
+        output_path = str(RESULTS_DIR_P / f"{task_id}_output.mp4")
         
-        # Switch model if needed
-        if predictor.model_name != model_name:
-            predictor.model_manager.set_current_model(model_name)
-            predictor.model = predictor.model_manager.get_current_model()
-            predictor.model_name = model_name
+        await update_task(task_id, progress=50)
         
-        current_tasks[task_id]["progress"] = 50
-        
-        # Generate motion transfer
-        result_path = predictor.generate_motion(source_path, driving_path, output_path)
+        # Generate motion transfer in the worker process, which switches model itself
+        loop = asyncio.get_running_loop()
+        pool = executor
+        try:
+            result_path = await loop.run_in_executor(
+                pool, run_motion_transfer, source_path, driving_path, output_path, model_name
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM or CUDA fault); replace the pool once so later jobs run
+            if executor is pool:
+                print("⚠️ Inference worker died, restarting worker pool")
+                executor = create_executor()
+                pool.shutdown(wait=False)
+            raise RuntimeError("Inference worker crashed, please retry")
         
-        current_tasks[task_id]["progress"] = 75
+        await update_task(task_id, progress=75)
         
         # Move to final location
-        final_path = os.path.join(RESULTS_DIR, f"{task_id}.mp4")
+        final_path = str(RESULTS_DIR_P / f"{task_id}.mp4")
         shutil.move(result_path, final_path)
         
+        if cache_key is not None:
+            await cache_prediction(cache_key, final_path)
+        
         # Clean up temporary files
         os.remove(source_path)
         os.remove(driving_path)
         
         # Update task status
-        current_tasks[task_id] = {
+        await set_task(task_id, {
             "status": "completed",
             "progress": 100,
             "output_path": final_path
-        }
+        })
         
     except Exception as e:
-        current_tasks[task_id] = {
+        await set_task(task_id, {
             "status": "error",
             "error": str(e),
             "progress": 0
-        }
+        })
 
 @app.get("/task/{task_id}")
 async def get_task_status(task_id: str):
@@ -280,13 +597,18 @@ async def download_result(task_id: str):
         
     output_path = task["output_path"]
     
-    if not os.path.exists(output_path):
+    try:
+        stat_result = os.stat(output_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Output file not found")
         
+    # Passing stat_result sets Content-Length up front so the file can be sent with sendfile
     return FileResponse(
         output_path,
         media_type="video/mp4",
-        filename=f"motion3d_{task_id}.mp4"
+        filename=f"motion3d_{task_id}.mp4",
+        stat_result=stat_result,
+        headers={"Accept-Ranges": "bytes", "Cache-Control": "public, max-age=3600"}
     )
 
 @app.post("/benchmark", response_model=BenchmarkResult)
@@ -297,7 +619,8 @@ async def benchmark_model(
     num_runs: int = 3
 ):
     """Benchmark model performance"""
-    if not predictor:
+    global predictor
+    if not active_model_name:
         raise HTTPException(status_code=503, detail="No models loaded")
     
     # Save files temporarily
@@ -310,14 +633,16 @@ async def benchmark_model(
         driving_path = driving_file.name
     
     try:
-        # Switch model if needed
-        if predictor.model_name != model_name:
-            predictor.model_manager.set_current_model(model_name)
-            predictor.model = predictor.model_manager.get_current_model()
-            predictor.model_name = model_name
-        
-        # Run benchmark
-        results = predictor.benchmark_performance(source_path, driving_path, num_runs)
+        # Run benchmark off the event loop so task polling stays responsive; the lock
+        # keeps the model from being switched underneath it and serializes benchmarks
+        async with _predictor_lock:
+            # Load the predictor on first use, and switch model if needed
+            if predictor is None:
+                predictor = await run_in_threadpool(Motion3DPredictor, model_name)
+            elif predictor.model_name != model_name:
+                await run_in_threadpool(predictor.switch_model, model_name)
+                
+            results = await run_in_threadpool(predictor.benchmark_performance, source_path, driving_path, num_runs)
         
         return BenchmarkResult(**results)
         
@@ -329,24 +654,21 @@ async def benchmark_model(
 @app.delete("/task/{task_id}")
 async def cleanup_task(task_id: str):
     """Clean up task files and status"""
-    if task_id not in current_tasks:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    task = current_tasks[task_id]
-    
-    # Remove output file if exists
-    if "output_path" in task and os.path.exists(task["output_path"]):
-        os.remove(task["output_path"])
-    
-    # Remove task from memory
-    del current_tasks[task_id]
+    async with _tasks_lock:
+        if task_id not in current_tasks:
+            raise HTTPException(status_code=404, detail="Task not found")
+        
+        # Remove task from memory along with its output file
+        task = current_tasks.pop(task_id)
+        remove_task_files(task)
     
     return {"message": "Task cleaned up successfully"}
 
 @app.get("/tasks")
 async def list_tasks():
     """List all current tasks"""
-    return current_tasks
+    async with _tasks_lock:
+        return dict(current_tasks)
 
 if __name__ == "__main__":
     uvicorn.run(
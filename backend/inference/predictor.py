@@ -4,14 +4,40 @@ Combines different models for motion transfer and 3D visualization
 """
 
 import os
+import time
 import torch
+import torch.nn.functional as F
 import numpy as np
-from typing import Dict, Optional, Tuple
 import cv2
+from typing import Callable, Dict, Optional, Tuple
+from pathlib import Path
 from PIL import Image
-import imageio
+
+try:
+    from torchcodec.decoders import VideoDecoder
+except ImportError:
+    VideoDecoder = None
 
 from ..models.model_loader import get_model_manager
+from ..utils.video_processing import VideoProcessor
+from .tensorrt_engine import load_tensorrt_model
+from .aot_compile import load_aot_model
+
+# Models with fixed input shapes that are served through TensorRT when available
+TENSORRT_MODELS = ("fomm",)
+
+# Models AOT-compiled for the fixed clip shape when benchmarking on CUDA
+AOT_BENCHMARK_MODELS = ("motion_clone",)
+
+# Models whose output is pre-sigmoid logits; the others end in a sigmoid and output [0, 1]
+LOGIT_OUTPUT_MODELS = ("fomm",)
+
+# Models that run in BF16 under CUDA autocast where supported; others use FP16
+BF16_MODELS = ("motion_clone",)
+
+# Input pixels converted to float per resize step (about 190 MB of float32 RGB),
+# so preprocessing memory doesn't grow with the upload's resolution
+RESIZE_CHUNK_PIXELS = 1920 * 1080 * 8
 
 class Motion3DPredictor:
     """
@@ -27,21 +53,197 @@ class Motion3DPredictor:
             device: Device to use ("auto", "cuda", "cpu")
         """
         self.model_manager = get_model_manager(device)
-        self.model = self.model_manager.load_model(model_name)
+        # Resolve "auto" to the concrete device chosen by the model manager
+        self.device = self.model_manager.device
+        
+        # Reusable pinned staging buffer and a dedicated H2D copy stream
+        self._pin_buffer = None
+        self._copy_done = None
+        self._copy_stream = torch.cuda.Stream() if self.device.startswith('cuda') else None
+        
+        # Models prepared for inference, kept resident so switching is a lookup
+        self.prepared_models = {}
+        self.switch_model(model_name)
+        
+        # AOT-compiled models by package path, and packages that failed to build
+        self._aot_models = {}
+        self._aot_failed = set()
+        
+    def _prepare_model(self, model_name: str, model: torch.nn.Module) -> torch.nn.Module:
+        """Prepare a loaded model for fast inference on the current device"""
+        # Prefer an ahead-of-time specialized TensorRT engine for fixed-shape models
+        engine_path = self.model_manager.get_engine_path(model_name)
+        if self.device.startswith('cuda') and model_name in TENSORRT_MODELS and engine_path is not None:
+            trt_model = load_tensorrt_model(model, engine_path, self.device)
+            if trt_model is not None:
+                return trt_model
+                
+        # NHWC layout lets cuDNN pick Tensor Core friendly conv kernels
+        model = model.to(memory_format=torch.channels_last)
+        
+        # CUDA graphs via torch.compile remove per-layer launch overhead
+        if self.device.startswith('cuda') and hasattr(torch, 'compile'):
+            model = torch.compile(model, mode='reduce-overhead', fullgraph=False)
+        return model
+        
+    def switch_model(self, model_name: str) -> torch.nn.Module:
+        """
+        Switch the active model
+        
+        Args:
+            model_name: Model to activate ("motion_clone", "fomm")
+            
+        Returns:
+            Active model
+        """
+        # The manager keeps loaded models resident, so this only loads once
+        model = self.model_manager.set_current_model(model_name)
+        if model_name not in self.prepared_models:
+            self.prepared_models[model_name] = self._prepare_model(model_name, model)
+            
+        self.model = self.prepared_models[model_name]
         self.model_name = model_name
-        self.device = device
+        return self.model
+        
+    def preload_models(self):
+        """Load and prepare all available models so later switches don't reload"""
+        active_model_name = self.model_name
+        for model_name in self.model_manager.get_available_models():
+            self.switch_model(model_name)
+        self.switch_model(active_model_name)
         
-        # Image preprocessing
-        self.transform = self._get_transform()
+    def _run_model(self, source_tensor: torch.Tensor, driving_tensor: torch.Tensor,
+                   model: Optional[Callable] = None) -> torch.Tensor:
+        """
+        Run the model forward pass, using FP16/BF16 autocast on CUDA
         
-    def _get_transform(self):
-        """Get image preprocessing transform"""
-        import torchvision.transforms as transforms
-        return transforms.Compose([
-            transforms.Resize((256, 256)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-        ])
+        Args:
+            source_tensor: Preprocessed source image [1, 3, H, W]
+            driving_tensor: Preprocessed driving video [1, T, 3, H, W]
+            model: Model to run (optional, uses the active model if None)
+            
+        Returns:
+            Generated video tensor [1, T, 3, H, W]
+        """
+        if model is None:
+            model = self.model
+            
+        with torch.inference_mode():
+            if self.device.startswith('cuda'):
+                with torch.autocast(device_type='cuda', dtype=self._autocast_dtype()):
+                    return model(source_tensor, driving_tensor)
+            # FP32 path for CPU
+            return model(source_tensor, driving_tensor)
+            
+    def _load_aot_model(self, source_tensor: torch.Tensor, driving_tensor: torch.Tensor) -> Optional[Callable]:
+        """
+        Get the active model AOT-compiled for these exact input shapes
+        
+        Args:
+            source_tensor: Preprocessed source image [1, 3, H, W]
+            driving_tensor: Preprocessed driving video [1, T, 3, H, W]
+            
+        Returns:
+            Compiled callable, or None if the model isn't AOT-compiled here
+        """
+        if not self.device.startswith('cuda') or self.model_name not in AOT_BENCHMARK_MODELS:
+            return None
+            
+        dtype = self._autocast_dtype()
+        package_path = self.model_manager.get_aot_package_path(self.model_name, driving_tensor.shape[1], dtype)
+        if package_path is None or package_path in self._aot_failed:
+            return None
+        if package_path in self._aot_models:
+            return self._aot_models[package_path]
+            
+        # Export the raw module under the same autocast/inference context it runs in
+        model = self.model_manager.loaded_models[self.model_name]
+        with torch.inference_mode(), torch.autocast(device_type='cuda', dtype=dtype):
+            aot_model = load_aot_model(model, package_path, (source_tensor, driving_tensor))
+            
+        # Remember failures so a broken export isn't retried on every call
+        if aot_model is None:
+            self._aot_failed.add(package_path)
+        else:
+            self._aot_models[package_path] = aot_model
+            self.model_manager.prune_aot_packages(self.model_name)
+        return aot_model
+        
+    def _autocast_dtype(self) -> torch.dtype:
+        """Get the CUDA autocast dtype for the active model"""
+        if self.model_name in BF16_MODELS and torch.cuda.is_bf16_supported():
+            return torch.bfloat16
+        return torch.float16
+        
+    def _get_staging_buffer(self, shape: Tuple[int, ...]) -> torch.Tensor:
+        """
+        Get a uint8 CPU buffer of the given shape, reusing one pinned allocation on CUDA
+        
+        Args:
+            shape: Buffer shape
+            
+        Returns:
+            uint8 tensor view of the staging buffer
+        """
+        if self._copy_stream is None:
+            return torch.empty(shape, dtype=torch.uint8)
+            
+        # Don't overwrite the buffer while a previous upload is still reading it
+        if self._copy_done is not None:
+            self._copy_done.synchronize()
+            
+        numel = int(np.prod(shape))
+        if self._pin_buffer is None or self._pin_buffer.numel() < numel:
+            self._pin_buffer = torch.empty(numel, dtype=torch.uint8, pin_memory=True)
+        return self._pin_buffer[:numel].view(shape)
+        
+    def _to_device(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Copy a CPU tensor to the target device
+        
+        Pinned tensors (from the staging buffer) are copied on a dedicated stream,
+        so the upload overlaps with work already queued on the compute stream.
+        Pageable tensors are copied directly; pinning them per call costs more
+        than the copy it would speed up.
+        """
+        if self._copy_stream is None or not tensor.is_pinned():
+            return tensor.to(self.device)
+            
+        with torch.cuda.stream(self._copy_stream):
+            device_tensor = tensor.to(self.device, non_blocking=True)
+            self._copy_done = torch.cuda.Event()
+            self._copy_done.record(self._copy_stream)
+            
+        # Order later compute after the copy and keep the memory alive across streams
+        compute_stream = torch.cuda.current_stream()
+        compute_stream.wait_stream(self._copy_stream)
+        device_tensor.record_stream(compute_stream)
+        return device_tensor
+        
+    def _resize_and_normalize(self, frames: torch.Tensor) -> torch.Tensor:
+        """
+        Resize and normalize a batch of frames in batched chunks
+        
+        Only RESIZE_CHUNK_PIXELS input pixels are converted to float at a time,
+        and each chunk is written into one preallocated output.
+        
+        Args:
+            frames: uint8 tensor [N, 3, H, W] on the target device
+            
+        Returns:
+            Float tensor [N, 3, 256, 256] in [-1, 1], channels_last
+        """
+        num_frames, _, height, width = frames.shape
+        output = torch.empty((num_frames, 3, 256, 256), dtype=torch.float32, device=frames.device,
+                             memory_format=torch.channels_last)
+        
+        chunk_frames = max(1, RESIZE_CHUNK_PIXELS // (height * width))
+        for start in range(0, num_frames, chunk_frames):
+            chunk = frames[start:start + chunk_frames].float()
+            output[start:start + chunk_frames] = F.interpolate(chunk, size=(256, 256), mode='bilinear',
+                                                               align_corners=False, antialias=True)
+            
+        return output.div_(127.5).sub_(1.0)
         
     def preprocess_image(self, image_path: str) -> torch.Tensor:
         """
@@ -53,9 +255,14 @@ class Motion3DPredictor:
         Returns:
             Preprocessed tensor [1, 3, H, W]
         """
-        image = Image.open(image_path).convert('RGB')
-        image = self.transform(image)
-        return image.unsqueeze(0).to(self.device)
+        image = np.asarray(Image.open(image_path).convert('RGB'))
+        
+        # Copy the decoded pixels into the reusable (pinned on CUDA) staging buffer
+        staging = self._get_staging_buffer((1,) + image.shape)
+        np.copyto(staging.numpy()[0], image)
+        
+        # Upload the dense [1, H, W, 3] buffer, then view it as [1, 3, H, W] on the device
+        return self._resize_and_normalize(self._to_device(staging).permute(0, 3, 1, 2))
         
     def preprocess_video(self, video_path: str, max_frames: int = 100) -> torch.Tensor:
         """
@@ -68,37 +275,103 @@ class Motion3DPredictor:
         Returns:
             Preprocessed video tensor [1, T, 3, H, W]
         """
-        # Read video
+        # Decode on the GPU with NVDEC, skipping CPU decode and the H2D copy; CPU-only
+        # torchcodec builds, codecs NVDEC lacks and driver errors fall back to OpenCV
+        if self.device.startswith('cuda') and VideoDecoder is not None:
+            try:
+                video = self._decode_video_cuda(video_path, max_frames)
+            except Exception as e:
+                print(f"⚠️ GPU video decode failed, falling back to OpenCV: {e}")
+            else:
+                return self._resize_and_normalize(video).unsqueeze(0)
+                
         cap = cv2.VideoCapture(video_path)
-        frames = []
-        
-        frame_count = 0
-        while cap.isOpened() and frame_count < max_frames:
+        # CAP_PROP_FRAME_COUNT is only an estimate; it sizes the buffer, but decoding
+        # continues past it up to max_frames or the end of the stream
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        capacity = min(frame_count, max_frames) if frame_count > 0 else max_frames
+        
+        # Size the buffer from the first decoded frame; CAP_PROP_FRAME_WIDTH/HEIGHT
+        # report the stream size, which differs for e.g. auto-rotated phone videos
+        ret, frame = cap.read()
+        if not ret:
+            cap.release()
+            raise ValueError("No frames could be extracted from video")
+        height, width = frame.shape[:2]
+        
+        # Decode straight into one preallocated uint8 [T, H, W, 3] buffer,
+        # pinned and reused across requests on CUDA so the upload runs asynchronously
+        frames = self._get_staging_buffer((capacity, height, width, 3))
+        frames_np = frames.numpy()
+        
+        decoded = 0
+        while True:
+            # The frame count under-reported, so grow to max_frames keeping decoded frames
+            if decoded == capacity:
+                capacity = max_frames
+                grown = self._get_staging_buffer((capacity, height, width, 3))
+                if grown.data_ptr() != frames.data_ptr():
+                    grown[:decoded].copy_(frames[:decoded])
+                frames = grown
+                frames_np = frames.numpy()
+                
+            # cvtColor silently allocates a new array instead of writing into dst
+            # when sizes differ, so bring any odd-sized frame to the buffer's size
+            if frame.shape[:2] != (height, width):
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                
+            # Convert BGR to RGB in place
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frames_np[decoded])
+            decoded += 1
+            if decoded == max_frames:
+                break
+                
             ret, frame = cap.read()
             if not ret:
                 break
                 
-            # Convert BGR to RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Convert to PIL and apply transforms
-            frame_pil = Image.fromarray(frame_rgb)
-            frame_tensor = self.transform(frame_pil)
-            frames.append(frame_tensor)
-            
-            frame_count += 1
-            
         cap.release()
         
+        # Upload the dense [T, H, W, 3] frames, then view them as [T, 3, H, W] on the device;
+        # a permuted host view would force a pageable contiguous copy first
+        video = self._to_device(frames[:decoded]).permute(0, 3, 1, 2)
+        video_tensor = self._resize_and_normalize(video)
+        
+        # Add batch dimension: [1, T, 3, H, W]
+        return video_tensor.unsqueeze(0)
+        
+    def _decode_video_cuda(self, video_path: str, max_frames: int) -> torch.Tensor:
+        """
+        Decode driving video frames directly into CUDA memory
+        
+        Args:
+            video_path: Path to video file
+            max_frames: Maximum number of frames to extract
+            
+        Returns:
+            uint8 video tensor [T, 3, H, W] on the target device
+        """
+        decoder = VideoDecoder(video_path, device=self.device)
+        num_frames = decoder.metadata.num_frames
+        
+        if num_frames is not None:
+            num_frames = min(num_frames, max_frames)
+            if num_frames == 0:
+                raise ValueError("No frames could be extracted from video")
+            return decoder.get_frames_in_range(0, num_frames).data
+            
+        # Without a frame count, decode frame by frame so short clips stop at their end
+        frames = []
+        for index in range(max_frames):
+            try:
+                frames.append(decoder.get_frame_at(index).data)
+            except IndexError:
+                break
+                
         if not frames:
             raise ValueError("No frames could be extracted from video")
             
-        # Stack frames: [T, 3, H, W]
-        video_tensor = torch.stack(frames, dim=0)
-        # Add batch dimension: [1, T, 3, H, W]
-        video_tensor = video_tensor.unsqueeze(0)
-        
-        return video_tensor.to(self.device)
+        return torch.stack(frames)
         
     def generate_motion(self, source_image_path: str, driving_video_path: str, 
                       output_path: str = None, config: Dict = None) -> str:
@@ -132,8 +405,7 @@ class Motion3DPredictor:
         
         # Generate motion transfer
         print(f"🎯 Running {self.model_name} model...")
-        with torch.no_grad():
-            output_tensor = self.model(source_tensor, driving_tensor)
+        output_tensor = self._run_model(source_tensor, driving_tensor)
             
         print(f"   Output shape: {output_tensor.shape}")
         
@@ -146,8 +418,8 @@ class Motion3DPredictor:
         
     def _get_default_output_path(self, source_image_path: str, driving_video_path: str) -> str:
         """Generate default output filename"""
-        source_name = os.path.splitext(os.path.basename(source_image_path))[0]
-        driving_name = os.path.splitext(os.path.basename(driving_video_path))[0]
+        source_name = Path(source_image_path).stem
+        driving_name = Path(driving_video_path).stem
         
         output_dir = "data/examples/results"
         os.makedirs(output_dir, exist_ok=True)
@@ -162,22 +434,19 @@ class Motion3DPredictor:
             output_tensor: Output tensor [1, T, 3, H, W]
             output_path: Path to save video
         """
-        # Remove batch dimension and move to CPU
-        frames = output_tensor.squeeze(0).cpu()
+        # Map to [0, 255] on the output device; the first op is out-of-place
+        # because inference tensors can't be updated in place
+        # Sigmoid already bounds to [0, 1], so neither path needs a clamp pass
+        if self.model_name in LOGIT_OUTPUT_MODELS:
+            frames = torch.sigmoid(output_tensor.squeeze(0)).mul_(255.0)
+        else:
+            frames = output_tensor.squeeze(0).mul(255.0)
         
-        # Denormalize from [-1, 1] to [0, 1]
-        frames = (frames + 1.0) / 2.0
-        frames = torch.clamp(frames, 0.0, 1.0)
+        # Single host transfer of a contiguous [T, H, W, 3] uint8 array
+        frames = frames.to(torch.uint8).permute(0, 2, 3, 1).contiguous().cpu().numpy()
         
-        # Convert to numpy and save
-        frame_list = []
-        for i in range(frames.shape[0]):
-            frame = frames[i].permute(1, 2, 0).numpy()
-            frame = (frame * 255).astype(np.uint8)
-            frame_list.append(frame)
-            
-        # Save as MP4
-        imageio.mimsave(output_path, frame_list, fps=25, quality=8)
+        # Save as MP4, piping raw frames to a hardware encoder when available
+        VideoProcessor.encode_frames(frames, output_path, fps=25)
         
     def get_model_info(self) -> Dict:
         """Get information about current model"""
@@ -189,7 +458,7 @@ class Motion3DPredictor:
         }
         
     def benchmark_performance(self, test_image: str, test_video: str, 
-                           num_runs: int = 3) -> Dict:
+                           num_runs: int = 3, aot_compile: bool = False) -> Dict:
         """
         Benchmark model performance
         
@@ -197,34 +466,49 @@ class Motion3DPredictor:
             test_image: Path to test image
             test_video: Path to test video
             num_runs: Number of benchmark runs
+            aot_compile: AOT-compile the model for this clip's exact shape first;
+                the first run per shape can take minutes, so only offline tools opt in
             
         Returns:
             Performance metrics
         """
-        import time
-        
         print(f"⏱️ Benchmarking {self.model_name}...")
         
         # Preprocess once
         source_tensor = self.preprocess_image(test_image)
         driving_tensor = self.preprocess_video(test_video)
         
-        times = []
+        # Benchmark shapes are fixed, so use a shape-specialized AOT build when requested
+        model = self._load_aot_model(source_tensor, driving_tensor) if aot_compile else None
+        if model is None:
+            model = self.model
         
-        for i in range(num_runs):
-            torch.cuda.synchronize() if torch.cuda.is_available() else None
-            
-            start_time = time.time()
-            with torch.no_grad():
-                output = self.model(source_tensor, driving_tensor)
-            torch.cuda.synchronize() if torch.cuda.is_available() else None
-            
-            end_time = time.time()
-            times.append(end_time - start_time)
+        # Warm up so compilation and autotuning aren't counted in the timed runs
+        self._run_model(source_tensor, driving_tensor, model)
+        
+        if self.device.startswith('cuda'):
+            # Time on-stream with CUDA events and synchronize once at the end
+            starts = [torch.cuda.Event(enable_timing=True) for _ in range(num_runs)]
+            ends = [torch.cuda.Event(enable_timing=True) for _ in range(num_runs)]
             
-            print(f"   Run {i+1}: {times[-1]:.3f}s")
+            for i in range(num_runs):
+                starts[i].record()
+                output = self._run_model(source_tensor, driving_tensor, model)
+                ends[i].record()
+                
+            torch.cuda.synchronize()
+            times = [start.elapsed_time(end) / 1000.0 for start, end in zip(starts, ends)]
+        else:
+            times = []
+            for i in range(num_runs):
+                start_time = time.perf_counter()
+                output = self._run_model(source_tensor, driving_tensor, model)
+                times.append(time.perf_counter() - start_time)
+                
+        for i, run_time in enumerate(times):
+            print(f"   Run {i+1}: {run_time:.3f}s")
             
-        avg_time = np.mean(times)
+        avg_time = sum(times) / len(times)
         fps = driving_tensor.shape[1] / avg_time
         
         results = {
@@ -0,0 +1,168 @@
+"""
+TensorRT engine support for Motion3D Transformer
+Exports fixed-shape models to ONNX and runs them through a cached TensorRT engine
+"""
+
+import os
+import shutil
+import subprocess
+import torch
+import torch.nn as nn
+from typing import Optional
+
+try:
+    import tensorrt as trt
+except ImportError:
+    trt = None
+
+IMAGE_SIZE = 256
+MAX_FRAMES = 100
+
+# Bump whenever model outputs or export settings change so cached engines are rebuilt
+ENGINE_FORMAT_VERSION = 2
+
+def is_tensorrt_available() -> bool:
+    """Check if TensorRT and trtexec are available for building engines"""
+    return trt is not None and torch.cuda.is_available() and shutil.which("trtexec") is not None
+
+def export_onnx(model: nn.Module, onnx_path: str, device: str = "cuda"):
+    """
+    Export a motion transfer model to ONNX with a dynamic frame axis
+    
+    Args:
+        model: Model taking (source [1, 3, H, W], driving [1, T, 3, H, W])
+        onnx_path: Output ONNX path
+        device: Device to trace on
+    """
+    source = torch.zeros(1, 3, IMAGE_SIZE, IMAGE_SIZE, device=device)
+    driving = torch.zeros(1, 2, 3, IMAGE_SIZE, IMAGE_SIZE, device=device)
+    
+    torch.onnx.export(
+        model,
+        (source, driving),
+        onnx_path,
+        input_names=["source", "driving"],
+        output_names=["video"],
+        dynamic_axes={"driving": {1: "T"}, "video": {1: "T"}},
+        opset_version=17
+    )
+
+def get_versioned_engine_path(engine_path: str) -> str:
+    """Tag an engine path with the engine format and TensorRT versions it is built for"""
+    root, ext = os.path.splitext(engine_path)
+    return f"{root}-v{ENGINE_FORMAT_VERSION}-trt{trt.__version__}{ext}"
+
+def build_engine(onnx_path: str, engine_path: str):
+    """
+    Build an FP16 TensorRT engine from an ONNX model with trtexec
+    
+    The engine is written to a temporary file and moved into place, so an
+    interrupted build never leaves a truncated engine behind.
+    
+    Args:
+        onnx_path: Input ONNX path
+        engine_path: Output engine path
+    """
+    tmp_path = engine_path + ".tmp"
+    frame_shape = f"3x{IMAGE_SIZE}x{IMAGE_SIZE}"
+    subprocess.run([
+        "trtexec",
+        f"--onnx={onnx_path}",
+        f"--saveEngine={tmp_path}",
+        "--fp16",
+        f"--minShapes=source:1x{frame_shape},driving:1x1x{frame_shape}",
+        f"--optShapes=source:1x{frame_shape},driving:1x{MAX_FRAMES}x{frame_shape}",
+        f"--maxShapes=source:1x{frame_shape},driving:1x{MAX_FRAMES}x{frame_shape}"
+    ], check=True)
+    os.replace(tmp_path, engine_path)
+
+class TensorRTModel(nn.Module):
+    """
+    Runs a serialized TensorRT engine with the same (source, driving) -> video API
+    
+    The original module is kept as a submodule so parameter counts and
+    model info keep working; its weights are not used for inference.
+    """
+    
+    def __init__(self, engine_path: str, module: nn.Module):
+        super().__init__()
+        self.module = module
+        
+        logger = trt.Logger(trt.Logger.WARNING)
+        with open(engine_path, "rb") as f:
+            self.engine = trt.Runtime(logger).deserialize_cuda_engine(f.read())
+        if self.engine is None:
+            raise RuntimeError(f"Could not deserialize TensorRT engine {engine_path}")
+        self.context = self.engine.create_execution_context()
+        
+    def forward(self, source_image: torch.Tensor, driving_video: torch.Tensor) -> torch.Tensor:
+        """
+        Run the engine
+        
+        Args:
+            source_image: Source image tensor [1, 3, H, W]
+            driving_video: Driving video tensor [1, T, 3, H, W]
+            
+        Returns:
+            Generated video tensor [1, T, 3, H, W]
+        """
+        # The engine expects dense NCHW float32 bindings
+        source_image = source_image.float().contiguous()
+        driving_video = driving_video.float().contiguous()
+        
+        self.context.set_input_shape("source", tuple(source_image.shape))
+        self.context.set_input_shape("driving", tuple(driving_video.shape))
+        
+        output = torch.empty(
+            tuple(self.context.get_tensor_shape("video")),
+            dtype=torch.float32,
+            device=source_image.device
+        )
+        
+        self.context.set_tensor_address("source", source_image.data_ptr())
+        self.context.set_tensor_address("driving", driving_video.data_ptr())
+        self.context.set_tensor_address("video", output.data_ptr())
+        self.context.execute_async_v3(torch.cuda.current_stream().cuda_stream)
+        
+        return output
+
+def load_tensorrt_model(model: nn.Module, engine_path: str, device: str = "cuda") -> Optional[TensorRTModel]:
+    """
+    Load a TensorRT engine for a model, building and caching it if missing
+    
+    A cached engine that fails to load (e.g. corrupt) is rebuilt once.
+    
+    Args:
+        model: Model to export if no engine is cached
+        engine_path: Base path of the cached engine, tagged with version info on disk
+        device: Device to export on
+        
+    Returns:
+        TensorRTModel, or None if TensorRT is not available or the engine can't be used
+    """
+    if not is_tensorrt_available():
+        return None
+        
+    engine_path = get_versioned_engine_path(engine_path)
+    for attempt in range(2):
+        if not os.path.exists(engine_path):
+            print(f"🔧 Building TensorRT engine at {engine_path}...")
+            onnx_path = os.path.splitext(engine_path)[0] + ".onnx"
+            try:
+                export_onnx(model, onnx_path, device)
+                build_engine(onnx_path, engine_path)
+            except Exception as e:
+                print(f"⚠️ Failed to build TensorRT engine: {e}")
+                return None
+                
+        try:
+            trt_model = TensorRTModel(engine_path, model)
+        except Exception as e:
+            print(f"⚠️ Failed to load TensorRT engine, discarding it: {e}")
+            os.remove(engine_path)
+            continue
+            
+        print(f"✅ Loaded TensorRT engine from {engine_path}")
+        return trt_model
+        
+    return None
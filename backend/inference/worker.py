@@ -0,0 +1,45 @@
+"""
+Inference worker process for Motion3D Transformer
+Runs motion transfer jobs outside the API process so the event loop stays responsive
+"""
+
+from typing import Optional
+
+from .predictor import Motion3DPredictor
+from ..models.model_loader import get_model_manager
+
+# Predictor owned by this worker process
+_predictor: Optional[Motion3DPredictor] = None
+
+def init_worker():
+    """Load and warm all available models when the worker process starts"""
+    global _predictor
+    try:
+        available = list(get_model_manager().get_available_models())
+        if available:
+            _predictor = Motion3DPredictor(available[0])
+            _predictor.preload_models()
+    except Exception as e:
+        print(f"⚠️ Worker failed to preload models: {e}")
+        _predictor = None
+
+def run_motion_transfer(source_path: str, driving_path: str, output_path: str, model_name: str) -> str:
+    """
+    Run a motion transfer job in the worker process
+    
+    Args:
+        source_path: Path to source image
+        driving_path: Path to driving video
+        output_path: Path to save output video
+        model_name: Model to use ("motion_clone", "fomm")
+        
+    Returns:
+        Path to generated video
+    """
+    global _predictor
+    if _predictor is None:
+        _predictor = Motion3DPredictor(model_name)
+    elif _predictor.model_name != model_name:
+        _predictor.switch_model(model_name)
+        
+    return _predictor.generate_motion(source_path, driving_path, output_path)
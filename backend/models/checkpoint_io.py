@@ -0,0 +1,90 @@
+"""
+Checkpoint I/O helpers for Motion3D Transformer
+Parallel page-cache prefetch and memory-mapped checkpoint loading
+"""
+
+import os
+import mmap
+import torch
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+def _populate_range(fd: int, offset: int, length: int):
+    """Fault in one byte range of a file so the kernel reads it into the page cache"""
+    populate_flag = getattr(mmap, "MAP_POPULATE", 0)
+    with mmap.mmap(fd, length, flags=mmap.MAP_SHARED | populate_flag,
+                   prot=mmap.PROT_READ, offset=offset) as mapped:
+        if not populate_flag and hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_WILLNEED)
+
+def prefetch_file(path: str, num_threads: int = 8):
+    """
+    Prefetch a file into the page cache with parallel mmap reads
+    
+    Args:
+        path: Path to file
+        num_threads: Number of concurrent readers
+    """
+    # Shared read-only mappings with flags/prot are Unix-only
+    if not hasattr(mmap, "MAP_SHARED"):
+        return
+        
+    file_size = os.path.getsize(path)
+    if file_size == 0:
+        return
+        
+    # Chunk offsets must be aligned to the mmap allocation granularity
+    granularity = mmap.ALLOCATIONGRANULARITY
+    chunk_size = -(-file_size // num_threads)
+    chunk_size = -(-chunk_size // granularity) * granularity
+    
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        with ThreadPoolExecutor(max_workers=num_threads) as pool:
+            futures = [
+                pool.submit(_populate_range, fd, offset, min(chunk_size, file_size - offset))
+                for offset in range(0, file_size, chunk_size)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        os.close(fd)
+
+def load_checkpoint(path: str) -> Dict:
+    """
+    Load a checkpoint to CPU, memory-mapping it when the format allows
+    
+    Args:
+        path: Path to checkpoint
+        
+    Returns:
+        Loaded checkpoint dictionary
+    """
+    # Prefetching only warms the page cache, so a failure must never block loading
+    try:
+        prefetch_file(path)
+    except (OSError, AttributeError, ValueError) as e:
+        print(f"⚠️ Checkpoint prefetch skipped: {e}")
+        
+    try:
+        return torch.load(path, map_location="cpu", mmap=True)
+    except (RuntimeError, TypeError):
+        # Legacy (non-zipfile) checkpoints and older torch versions can't be mmapped
+        return torch.load(path, map_location="cpu")
+
+def load_model_weights(model: torch.nn.Module, state_dict: Dict):
+    """
+    Load weights into a model by swapping in the checkpoint tensors
+    
+    assign=True reuses the (memory-mapped) checkpoint tensors instead of
+    copying them into freshly allocated parameters, keeping peak RAM near model size.
+    
+    Args:
+        model: Model to load into
+        state_dict: Model state dictionary
+    """
+    try:
+        model.load_state_dict(state_dict, assign=True)
+    except TypeError:
+        # assign is only available on torch >= 2.1
+        model.load_state_dict(state_dict)
\ No newline at end of file
@@ -3,12 +3,15 @@ First Order Motion Model (FOMM) Implementation
 Adapted from the original FOMM research for Motion3D Transformer
 """
 
+import os
 import torch
 import torch.nn as nn
 import numpy as np
 from typing import Dict, Tuple, Optional
 import torchvision.transforms as transforms
 
+from .checkpoint_io import load_checkpoint, load_model_weights
+
 class FOMMPredictor(nn.Module):
     """
     First Order Motion Model for image animation
@@ -36,31 +39,39 @@ class FOMMPredictor(nn.Module):
             driving_video: Driving video tensor [B, T, 3, H, W]
             
         Returns:
-            Generated video tensor [B, T, 3, H, W]
+            Generated video logits [B, T, 3, H, W]; apply sigmoid for [0, 1] pixels
         """
-        batch_size = source_image.shape[0]
-        num_frames = driving_video.shape[1]
+        batch_size, num_frames = driving_video.shape[:2]
+        height, width = driving_video.shape[3:]
         
         # Extract keypoints from source and driving frames
         source_kp = self.kp_detector(source_image)
-        driving_kp = []
-        for t in range(num_frames):
-            kp = self.kp_detector(driving_video[:, t])
-            driving_kp.append(kp)
-        driving_kp = torch.stack(driving_kp, dim=1)
-        
-        # Generate dense motion field
-        output_frames = []
-        for t in range(num_frames):
-            motion_representation = self.dense_motion_network(
-                source_image, source_kp, driving_kp[:, t]
-            )
-            
-            # Generate output frame
-            output = self.generator(source_image, motion_representation)
-            output_frames.append(output)
-            
-        return torch.stack(output_frames, dim=1)
+        
+        # Detect keypoints for all driving frames in a single batched call,
+        # keeping them flattened as [B*T, K, 2] to match the tiled features below
+        driving_kp = self.kp_detector(driving_video.reshape(batch_size * num_frames, 3, height, width))
+        
+        # Encode the source image once; the features don't depend on driving_kp
+        motion_features = self._repeat_frames(self.dense_motion_network.encode(source_image), num_frames)
+        encoded = self._repeat_frames(self.generator.encode(source_image), num_frames)
+        
+        # Generate dense motion field for all frames in one pass
+        motion_representation = self.dense_motion_network.decode(
+            motion_features, source_kp, driving_kp
+        )
+        
+        # Generate output frames
+        output = self.generator.decode(encoded, motion_representation)
+        
+        return output.view(batch_size, num_frames, *output.shape[1:])
+        
+    @staticmethod
+    def _repeat_frames(features: torch.Tensor, num_frames: int) -> torch.Tensor:
+        """Tile per-image features [B, ...] over time to [B*T, ...]"""
+        batch_size = features.shape[0]
+        return features.unsqueeze(1).expand(
+            -1, num_frames, *features.shape[1:]
+        ).reshape(batch_size * num_frames, *features.shape[1:])
 
 class KeypointDetector(nn.Module):
     """Detects keypoints for motion representation"""
@@ -131,16 +142,39 @@ class DenseMotionNetwork(nn.Module):
         Generate dense motion representation
         
         Args:
-            source_image: Source image
+            source_image: Source image [N, 3, H, W]
             source_kp: Source keypoints
-            driving_kp: Target keypoints
+            driving_kp: Target keypoints, batched over the same N as source_image
             
         Returns:
             Dictionary containing motion field and occlusion
         """
-        # Extract motion features
-        motion_features = self.motion_net(source_image)
+        return self.decode(self.encode(source_image), source_kp, driving_kp)
+        
+    def encode(self, source_image: torch.Tensor) -> torch.Tensor:
+        """
+        Extract motion features from the source image
+        
+        Args:
+            source_image: Source image [N, 3, H, W]
+            
+        Returns:
+            Motion features, reusable across all driving frames
+        """
+        return self.motion_net(source_image)
+        
+    def decode(self, motion_features: torch.Tensor, source_kp: Dict, driving_kp: Dict) -> Dict[str, torch.Tensor]:
+        """
+        Predict motion field and occlusion from cached motion features
         
+        Args:
+            motion_features: Features from encode(), batched over the same N as driving_kp
+            source_kp: Source keypoints
+            driving_kp: Target keypoints
+            
+        Returns:
+            Dictionary containing motion field and occlusion
+        """
         # Predict optical flow
         flow = self.flow_head(motion_features)
         
@@ -174,8 +208,8 @@ class OcclusionAwareGenerator(nn.Module):
             nn.ReLU(),
             nn.ConvTranspose2d(128, 64, 4, stride=2, padding=1),
             nn.ReLU(),
-            nn.ConvTranspose2d(64, 3, 4, stride=2, padding=1),
-            nn.Sigmoid()
+            # No final sigmoid: outputs are logits, folded into postprocessing
+            nn.ConvTranspose2d(64, 3, 4, stride=2, padding=1)
         )
         
     def forward(self, source_image: torch.Tensor, motion_representation: Dict) -> torch.Tensor:
@@ -187,11 +221,33 @@ class OcclusionAwareGenerator(nn.Module):
             motion_representation: Motion field and occlusion
             
         Returns:
-            Generated frame
+            Generated frame logits
+        """
+        return self.decode(self.encode(source_image), motion_representation)
+        
+    def encode(self, source_image: torch.Tensor) -> torch.Tensor:
         """
-        # Encode source image
-        encoded = self.encoder(source_image)
+        Encode source image
         
+        Args:
+            source_image: Source image [N, 3, H, W]
+            
+        Returns:
+            Encoded features, reusable across all driving frames
+        """
+        return self.encoder(source_image)
+        
+    def decode(self, encoded: torch.Tensor, motion_representation: Dict) -> torch.Tensor:
+        """
+        Generate output frame from cached source encoding
+        
+        Args:
+            encoded: Features from encode(), batched over the same N as motion_representation
+            motion_representation: Motion field and occlusion
+            
+        Returns:
+            Generated frame logits
+        """
         # Combine with motion representation
         flow = motion_representation['flow']
         occlusion = motion_representation['occlusion']
@@ -229,8 +285,9 @@ def load_fomm_model(model_path: str, device: str = "cuda") -> FOMMPredictor:
     
     # Load checkpoint if available
     if os.path.exists(model_path):
-        checkpoint = torch.load(model_path, map_location=device)
-        model.load_state_dict(checkpoint['model_state_dict'])
+        checkpoint = load_checkpoint(model_path)
+        load_model_weights(model, checkpoint['model_state_dict'])
+        del checkpoint
         print(f"✅ Loaded FOMM model from {model_path}")
     else:
         print(f"⚠️ Model checkpoint not found at {model_path}, using randomly initialized weights")
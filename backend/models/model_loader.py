@@ -4,18 +4,24 @@ Handles loading and management of different motion transfer models
 """
 
 import os
+import time
+import hashlib
 import torch
-from typing import Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
 from pathlib import Path
 
-from .motion_clone import MotionClonePredictor, load_motion_clone_model
-from .fomm_model import FOMMPredictor, load_fomm_model
-
 class ModelManager:
     """
     Manager class for loading and switching between different models
     """
     
+    # Seconds before checkpoint availability is probed on disk again
+    AVAILABLE_CACHE_TTL = 60.0
+    
+    # AOT packages kept per model; each one is specialized to a single clip length
+    MAX_AOT_PACKAGES = 4
+    
     def __init__(self, device: str = "auto"):
         """
         Initialize model manager
@@ -34,6 +40,14 @@ class ModelManager:
         self.current_model = None
         self.current_model_name = None
         
+        # Cached result of get_available_models and when it was probed
+        self._available_cache: Optional[Dict[str, str]] = None
+        self._available_cache_time = 0.0
+        
+        # Single writer thread so checkpoint saves overlap with GPU work
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint-io")
+        self._pending_saves: List[Future] = []
+        
     def load_model(self, model_name: str, model_path: Optional[str] = None) -> torch.nn.Module:
         """
         Load a specific model
@@ -53,13 +67,19 @@ class ModelManager:
         if model_path is None:
             model_path = self._get_default_model_path(model_name)
             
+        # Always check the disk here; the availability cache can be up to
+        # AVAILABLE_CACHE_TTL stale and is only meant for listing models
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model not found at {model_path}")
             
         # Load appropriate model
+        # Model modules are imported lazily so control paths that never load
+        # a model (e.g. listing models) don't pay for torchvision and friends
         if model_name == "motion_clone":
+            from .motion_clone import load_motion_clone_model
             model = load_motion_clone_model(model_path, self.device)
         elif model_name == "fomm":
+            from .fomm_model import load_fomm_model
             model = load_fomm_model(model_path, self.device)
         else:
             raise ValueError(f"Unknown model: {model_name}")
@@ -99,6 +119,10 @@ class ModelManager:
         Returns:
             Dictionary mapping model names to their paths
         """
+        cache_age = time.monotonic() - self._available_cache_time
+        if self._available_cache is not None and cache_age < self.AVAILABLE_CACHE_TTL:
+            return dict(self._available_cache)
+            
         models = {}
         
         # Check for MotionClone model
@@ -111,7 +135,13 @@ class ModelManager:
         if os.path.exists(fomm_path):
             models["fomm"] = fomm_path
             
-        return models
+        self._available_cache = models
+        self._available_cache_time = time.monotonic()
+        return dict(models)
+        
+    def invalidate_available_models(self):
+        """Force the next get_available_models call to probe the filesystem"""
+        self._available_cache = None
         
     def _get_default_model_path(self, model_name: str) -> str:
         """Get default path for a model"""
@@ -124,6 +154,63 @@ class ModelManager:
         else:
             raise ValueError(f"Unknown model: {model_name}")
             
+    def get_checkpoint_fingerprint(self, model_name: str) -> Optional[str]:
+        """
+        Get a short identifier of a model's checkpoint for naming derived artifacts
+        
+        Args:
+            model_name: Name of model
+            
+        Returns:
+            Hex fingerprint of the checkpoint size and mtime, or None if there is no checkpoint
+        """
+        try:
+            stat_result = os.stat(self._get_default_model_path(model_name))
+        except FileNotFoundError:
+            return None
+        return hashlib.blake2b(
+            f"{stat_result.st_size}:{stat_result.st_mtime_ns}".encode(), digest_size=6
+        ).hexdigest()
+        
+    def get_engine_path(self, model_name: str) -> Optional[str]:
+        """Get path of the cached TensorRT engine for a model's current checkpoint"""
+        fingerprint = self.get_checkpoint_fingerprint(model_name)
+        if fingerprint is None:
+            # Randomly initialized weights differ every run, so there is nothing to cache
+            return None
+        checkpoint_path = Path(self._get_default_model_path(model_name))
+        return str(checkpoint_path.with_name(f"{model_name}-{fingerprint}.engine"))
+        
+    def get_aot_package_path(self, model_name: str, num_frames: int, dtype: torch.dtype) -> Optional[str]:
+        """
+        Get path of the cached AOT-compiled package for a model's current checkpoint
+        
+        Args:
+            model_name: Name of model
+            num_frames: Clip length the package is specialized for
+            dtype: Autocast dtype the package is compiled under
+            
+        Returns:
+            Package path, or None if the model has no checkpoint to compile
+        """
+        fingerprint = self.get_checkpoint_fingerprint(model_name)
+        if fingerprint is None:
+            return None
+        dtype_name = str(dtype).replace("torch.", "")
+        checkpoint_path = Path(self._get_default_model_path(model_name))
+        return str(checkpoint_path.with_name(f"{model_name}-{fingerprint}-{dtype_name}-t{num_frames}.pt2"))
+        
+    def prune_aot_packages(self, model_name: str):
+        """Delete all but the MAX_AOT_PACKAGES most recently written AOT packages of a model"""
+        checkpoint_dir = Path(self._get_default_model_path(model_name)).parent
+        packages = sorted(
+            checkpoint_dir.glob(f"{model_name}-*-t*.pt2"),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True
+        )
+        for package_path in packages[self.MAX_AOT_PACKAGES:]:
+            package_path.unlink()
+        
     def list_models(self):
         """Print information about available and loaded models"""
         print("📋 Available Models:")
@@ -136,18 +223,76 @@ class ModelManager:
         if not available:
             print("  No models found. Run scripts/download_models.py first.")
             
+    def save_checkpoint_async(self, model_name: str, model_path: Optional[str] = None) -> Future:
+        """
+        Save a loaded model's weights without blocking on disk I/O
+        
+        The state dict is staged to CPU up front, so the model can keep
+        running (or training) while the checkpoint is written in the background.
+        
+        Args:
+            model_name: Name of loaded model to save
+            model_path: Path to write checkpoint (optional, uses default if None)
+            
+        Returns:
+            Future that completes once the checkpoint is on disk
+        """
+        if model_name not in self.loaded_models:
+            raise ValueError(f"Model {model_name} not loaded")
+            
+        if model_path is None:
+            model_path = self._get_default_model_path(model_name)
+            
+        # Device tensors are copied asynchronously and synced once; CPU tensors are
+        # cloned so later in-place updates can't race the writer thread. Shared
+        # weights (e.g. the MotionClone backbone) appear under several keys but are
+        # staged once, so torch.save writes their storage once
+        state_dict = {}
+        staged = {}
+        for key, value in self.loaded_models[model_name].state_dict().items():
+            value = value.detach()
+            source_id = (value.data_ptr(), value.dtype, tuple(value.shape), value.stride())
+            if source_id not in staged:
+                staged[source_id] = value.to("cpu", non_blocking=True) if value.is_cuda else value.clone()
+            state_dict[key] = staged[source_id]
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize(self.device)
+            
+        future = self._io_pool.submit(self._write_checkpoint, {"model_state_dict": state_dict}, model_path)
+        self._pending_saves = [f for f in self._pending_saves if not f.done()] + [future]
+        return future
+        
+    def _write_checkpoint(self, checkpoint: Dict, model_path: str):
+        """Write a checkpoint atomically so readers never see a partial file"""
+        os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+        tmp_path = model_path + ".tmp"
+        torch.save(checkpoint, tmp_path)
+        os.replace(tmp_path, model_path)
+        self.invalidate_available_models()
+        print(f"💾 Saved checkpoint to {model_path}")
+        
+    def wait_checkpoints(self):
+        """Block until all pending checkpoint saves are written, re-raising any failure"""
+        pending, self._pending_saves = self._pending_saves, []
+        wait(pending)
+        for future in pending:
+            future.result()
+            
     def unload_model(self, model_name: str):
         """Unload a model to free memory"""
         if model_name in self.loaded_models:
             del self.loaded_models[model_name]
+            self.invalidate_available_models()
             if self.current_model_name == model_name:
                 self.current_model = None
                 self.current_model_name = None
             print(f"🗑️ Unloaded {model_name} model")
             
-            # Clear GPU cache
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
+            # Releasing cached blocks syncs the device and scans the allocator,
+            # so only do it when explicitly requested
+            if os.environ.get("MOTION3D_EMPTY_CACHE") and self.device.startswith("cuda"):
+                with torch.cuda.device(self.device):
+                    torch.cuda.empty_cache()
         else:
             print(f"Model {model_name} not loaded")
 
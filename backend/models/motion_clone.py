@@ -3,12 +3,16 @@ MotionClone Model Implementation
 Adapted from the original MotionClone research for Motion3D Transformer
 """
 
+import os
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import numpy as np
 from typing import Dict, Tuple, Optional
 import torchvision.transforms as transforms
 
+from .checkpoint_io import load_checkpoint, load_model_weights
+
 class MotionClonePredictor(nn.Module):
     """
     MotionClone model for motion transfer from video to image
@@ -18,11 +22,14 @@ class MotionClonePredictor(nn.Module):
         super().__init__()
         self.config = config
         
+        # Conv backbone shared by both encoders, so its weights are stored once
+        backbone = ImageFeatureBackbone(config)
+        
         # Motion encoder
-        self.motion_encoder = MotionEncoder(config)
+        self.motion_encoder = MotionEncoder(config, backbone)
         
         # Appearance encoder  
-        self.appearance_encoder = AppearanceEncoder(config)
+        self.appearance_encoder = AppearanceEncoder(config, backbone)
         
         # Decoder
         self.decoder = MotionDecoder(config)
@@ -30,6 +37,7 @@ class MotionClonePredictor(nn.Module):
         # Temporal attention modules
         self.temporal_attention = TemporalAttention(config)
         
+    @torch.inference_mode()
     def forward(self, source_image: torch.Tensor, driving_video: torch.Tensor) -> torch.Tensor:
         """
         Forward pass for motion transfer
@@ -41,33 +49,51 @@ class MotionClonePredictor(nn.Module):
         Returns:
             Generated video tensor [B, T, 3, H, W]
         """
-        batch_size = source_image.shape[0]
-        num_frames = driving_video.shape[1]
+        batch_size, num_frames = driving_video.shape[:2]
         
         # Encode source appearance
         source_features = self.appearance_encoder(source_image)
         
-        # Encode driving motion
-        motion_features = []
-        for t in range(num_frames):
-            motion_feat = self.motion_encoder(driving_video[:, t])
-            motion_features.append(motion_feat)
-        
-        motion_features = torch.stack(motion_features, dim=1)
+        # Encode driving motion for all frames in a single batched call
+        motion_features = self.motion_encoder(driving_video.reshape(batch_size * num_frames, *driving_video.shape[2:]))
+        motion_features = motion_features.view(batch_size, num_frames, *motion_features.shape[1:])
         
         # Apply temporal attention
         attended_motion = self.temporal_attention(motion_features)
         
-        # Generate output frames
-        output_frames = []
-        for t in range(num_frames):
-            frame = self.decoder(source_features, attended_motion[:, t])
-            output_frames.append(frame)
-            
-        return torch.stack(output_frames, dim=1)
+        # Generate all output frames in one pass, tiling appearance over time.
+        # The tiled appearance may be a stride-0 view, but the flattened motion is
+        # either a copy or a view of the attention's own output, so the decoder may
+        # accumulate into it in place
+        appearance = source_features.unsqueeze(1).expand(-1, num_frames, *source_features.shape[1:])
+        frames = self.decoder(
+            appearance.reshape(batch_size * num_frames, *source_features.shape[1:]),
+            attended_motion.reshape(batch_size * num_frames, *attended_motion.shape[2:]),
+            inplace=True
+        )
+        
+        return frames.view(batch_size, num_frames, *frames.shape[1:])
+        
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Checkpoints from before the backbone was shared may hold different weights
+        # per encoder; give the motion encoder its own backbone so neither is lost
+        motion_prefix = prefix + 'motion_encoder.conv_layers.'
+        appearance_prefix = prefix + 'appearance_encoder.conv_layers.'
+        weights_differ = False
+        for key in [k for k in state_dict if k.startswith(motion_prefix)]:
+            appearance_key = appearance_prefix + key[len(motion_prefix):]
+            if appearance_key in state_dict and not torch.equal(state_dict[key], state_dict[appearance_key]):
+                weights_differ = True
+                break
+                
+        if weights_differ and self.motion_encoder.backbone is self.appearance_encoder.backbone:
+            print("⚠️ Checkpoint has separate motion/appearance encoder weights, keeping separate backbones")
+            device = next(self.appearance_encoder.backbone.parameters()).device
+            self.motion_encoder.backbone = ImageFeatureBackbone(self.config).to(device)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
 
-class MotionEncoder(nn.Module):
-    """Encoder for motion features from driving video"""
+class ImageFeatureBackbone(nn.Module):
+    """Convolutional feature extractor shared by the motion and appearance encoders"""
     
     def __init__(self, config: Dict):
         super().__init__()
@@ -85,23 +111,29 @@ class MotionEncoder(nn.Module):
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         return self.conv_layers(x)
 
-class AppearanceEncoder(nn.Module):
-    """Encoder for appearance features from source image"""
+class _BackboneEncoder(nn.Module):
+    """Base for encoders that run images through a (possibly shared) backbone"""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, backbone: Optional[ImageFeatureBackbone] = None):
         super().__init__()
-        # Implementation would go here
-        self.conv_layers = nn.Sequential(
-            nn.Conv2d(3, 64, 7, stride=2, padding=3),
-            nn.ReLU(),
-            nn.Conv2d(64, 128, 5, stride=2, padding=2),
-            nn.ReLU(),
-            nn.Conv2d(128, 256, 3, stride=2, padding=1),
-            nn.ReLU()
-        )
+        self.backbone = backbone if backbone is not None else ImageFeatureBackbone(config)
         
     def forward(self, x: torch.Tensor) -> torch.Tensor:
-        return self.conv_layers(x)
+        return self.backbone(x)
+        
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Map checkpoints saved when each encoder owned its conv layers
+        # (MotionClonePredictor un-shares the backbone first if their weights differ)
+        legacy_prefix = prefix + 'conv_layers.'
+        for key in [k for k in state_dict if k.startswith(legacy_prefix)]:
+            state_dict[prefix + 'backbone.' + key[len(prefix):]] = state_dict.pop(key)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+class MotionEncoder(_BackboneEncoder):
+    """Encoder for motion features from driving video"""
+
+class AppearanceEncoder(_BackboneEncoder):
+    """Encoder for appearance features from source image"""
 
 class MotionDecoder(nn.Module):
     """Decoder to generate output frames"""
@@ -114,30 +146,81 @@ class MotionDecoder(nn.Module):
             nn.ReLU(),
             nn.ConvTranspose2d(128, 64, 4, stride=2, padding=1),
             nn.ReLU(),
-            nn.ConvTranspose2d(64, 3, 4, stride=2, padding=1),
-            nn.Sigmoid()
+            nn.ConvTranspose2d(64, 3, 4, stride=2, padding=1)
         )
         
-    def forward(self, appearance_feat: torch.Tensor, motion_feat: torch.Tensor) -> torch.Tensor:
-        # Combine appearance and motion features
-        combined = appearance_feat + motion_feat
-        return self.deconv_layers(combined)
+    def forward(self, appearance_feat: torch.Tensor, motion_feat: torch.Tensor, inplace: bool = False) -> torch.Tensor:
+        # Combine appearance and motion features; callers that own motion_feat
+        # can accumulate into it and skip allocating a third feature map
+        combined = motion_feat.add_(appearance_feat) if inplace else appearance_feat + motion_feat
+        
+        # Keep the final sigmoid in FP32 for numerical stability under autocast
+        return torch.sigmoid(self.deconv_layers(combined).float())
+
+def _scaled_dot_product_attention(q: torch.Tensor, k: torch.Tensor, v: torch.Tensor) -> torch.Tensor:
+    """Reference softmax(QK^T / sqrt(d)) V for torch < 2.0, which lacks the fused kernel"""
+    scores = torch.matmul(q, k.transpose(-2, -1)) * (q.shape[-1] ** -0.5)
+    return torch.matmul(scores.softmax(dim=-1), v)
 
 class TemporalAttention(nn.Module):
     """Temporal attention module for motion coherence"""
     
     def __init__(self, config: Dict):
         super().__init__()
-        self.attention = nn.MultiheadAttention(
-            embed_dim=256,
-            num_heads=8,
-            batch_first=True
-        )
+        self.embed_dim = config.get('latent_dim', 256)
+        self.num_heads = config.get('num_heads', 8)
+        self.head_dim = self.embed_dim // self.num_heads
+        
+        # Fused query/key/value projection and output projection
+        self.in_proj = nn.Linear(self.embed_dim, 3 * self.embed_dim)
+        self.out_proj = nn.Linear(self.embed_dim, self.embed_dim)
         
     def forward(self, motion_features: torch.Tensor) -> torch.Tensor:
-        # Apply self-attention across temporal dimension
-        attended, _ = self.attention(motion_features, motion_features, motion_features)
+        """
+        Apply self-attention across temporal dimension
+        
+        Args:
+            motion_features: Motion features [B, T, C] or [B, T, C, h, w]; for
+                feature maps, each spatial location attends over time independently
+                
+        Returns:
+            Attended features with the same shape
+        """
+        spatial = motion_features.dim() == 5
+        if spatial:
+            batch_size, num_frames, channels, height, width = motion_features.shape
+            x = motion_features.permute(0, 3, 4, 1, 2).reshape(-1, num_frames, channels)
+        else:
+            x = motion_features
+            
+        # [N, T, 3C] -> 3 x [N, heads, T, head_dim]
+        num_seq, seq_len = x.shape[:2]
+        qkv = self.in_proj(x).view(num_seq, seq_len, 3, self.num_heads, self.head_dim)
+        q, k, v = qkv.permute(2, 0, 3, 1, 4).unbind(0)
+        
+        # Fused attention kernel (FlashAttention where available), no T x T matrix in memory
+        if hasattr(F, 'scaled_dot_product_attention'):
+            attended = F.scaled_dot_product_attention(q, k, v, is_causal=False)
+        else:
+            attended = _scaled_dot_product_attention(q, k, v)
+        attended = self.out_proj(attended.transpose(1, 2).reshape(num_seq, seq_len, self.embed_dim))
+        
+        if spatial:
+            attended = attended.view(batch_size, height, width, num_frames, channels).permute(0, 3, 4, 1, 2)
         return attended
+        
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Map checkpoints saved with the previous nn.MultiheadAttention layout
+        legacy_keys = {
+            'attention.in_proj_weight': 'in_proj.weight',
+            'attention.in_proj_bias': 'in_proj.bias',
+            'attention.out_proj.weight': 'out_proj.weight',
+            'attention.out_proj.bias': 'out_proj.bias'
+        }
+        for old_key, new_key in legacy_keys.items():
+            if prefix + old_key in state_dict:
+                state_dict[prefix + new_key] = state_dict.pop(prefix + old_key)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
 
 def load_motion_clone_model(model_path: str, device: str = "cuda") -> MotionClonePredictor:
     """
@@ -161,12 +244,15 @@ def load_motion_clone_model(model_path: str, device: str = "cuda") -> MotionClon
     
     # Load checkpoint if available
     if os.path.exists(model_path):
-        checkpoint = torch.load(model_path, map_location=device)
-        model.load_state_dict(checkpoint['model_state_dict'])
+        checkpoint = load_checkpoint(model_path)
+        load_model_weights(model, checkpoint['model_state_dict'])
+        del checkpoint
         print(f"✅ Loaded MotionClone model from {model_path}")
     else:
         print(f"⚠️ Model checkpoint not found at {model_path}, using randomly initialized weights")
     
     model.to(device)
     model.eval()
+    # Inference only; parameters never need gradients
+    model.requires_grad_(False)
     return model
\ No newline at end of file
@@ -2,12 +2,77 @@
 Video processing utilities for Motion3D Transformer
 """
 
+import os
+import subprocess
+from functools import lru_cache
 import cv2
 import numpy as np
 from typing import List, Tuple, Optional
 import imageio
+import imageio_ffmpeg
 from PIL import Image
 
+try:
+    from decord import VideoReader, cpu
+except ImportError:
+    VideoReader = None
+
+# Video decode backend: "decord" (batched, threaded) when installed, else "opencv"
+VIDEO_DECODE_BACKEND = os.environ.get("MOTION3D_VIDEO_BACKEND", "decord")
+
+# H.264 encoders in order of preference: hardware first, software fallback
+H264_ENCODERS = {
+    "h264_nvenc": ["-preset", "p2"],
+    "h264_videotoolbox": [],
+    "libx264": ["-preset", "veryfast"]
+}
+
+@lru_cache(maxsize=None)
+def get_h264_encoder() -> str:
+    """
+    Find the best H.264 encoder usable on this machine
+    
+    Each candidate is probed by encoding a single blank frame with the same
+    options used for real output, since ffmpeg lists hardware encoders even
+    when no matching device is present.
+    
+    Returns:
+        Name of the ffmpeg encoder
+    """
+    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+    for encoder in H264_ENCODERS:
+        result = subprocess.run(
+            [ffmpeg, "-hide_banner", "-loglevel", "error",
+             "-f", "lavfi", "-i", "color=size=256x256", "-frames:v", "1",
+             "-c:v", encoder, *H264_ENCODERS[encoder], "-pix_fmt", "yuv420p",
+             "-f", "null", "-"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        if result.returncode == 0:
+            return encoder
+    return "libx264"
+
+def get_resize_interpolation(source_shape: Tuple[int, ...], target_size: Tuple[int, int]) -> int:
+    """
+    Pick the OpenCV interpolation for a resize
+    
+    INTER_AREA is both faster and alias-free when shrinking; INTER_LINEAR is
+    used when enlarging, where INTER_AREA falls back to a slower path.
+    
+    Args:
+        source_shape: Source array shape (height, width, ...)
+        target_size: Target (width, height)
+        
+    Returns:
+        OpenCV interpolation flag
+    """
+    height, width = source_shape[:2]
+    target_width, target_height = target_size
+    if target_width * target_height < width * height:
+        return cv2.INTER_AREA
+    return cv2.INTER_LINEAR
+
 class VideoProcessor:
     """Utility class for video processing operations"""
     
@@ -21,8 +86,11 @@ class VideoProcessor:
             max_frames: Maximum number of frames to extract
             
         Returns:
-            List of frames as numpy arrays
+            List of BGR frames as numpy arrays
         """
+        if VIDEO_DECODE_BACKEND == "decord" and VideoReader is not None:
+            return VideoProcessor._extract_frames_decord(video_path, max_frames)
+            
         cap = cv2.VideoCapture(video_path)
         frames = []
         
@@ -41,28 +109,76 @@ class VideoProcessor:
         cap.release()
         return frames
         
+    @staticmethod
+    def _extract_frames_decord(video_path: str, max_frames: Optional[int] = None) -> List[np.ndarray]:
+        """Decode frames in one batched, multithreaded decord call"""
+        reader = VideoReader(video_path, ctx=cpu(0), num_threads=4)
+        num_frames = min(len(reader), max_frames) if max_frames else len(reader)
+        if num_frames == 0:
+            return []
+            
+        frames = reader.get_batch(list(range(num_frames))).asnumpy()
+        
+        # decord decodes to RGB; keep the BGR contract of the OpenCV path
+        return list(np.ascontiguousarray(frames[..., ::-1]))
+        
     @staticmethod
     def save_frames(frames: List[np.ndarray], output_path: str, fps: int = 25):
         """
         Save frames as video file
         
         Args:
-            frames: List of frames
+            frames: List of BGR frames
             output_path: Output video path
             fps: Frames per second
         """
         if not frames:
             raise ValueError("No frames to save")
             
+        # ffmpeg reads BGR directly, so no color conversion pass is needed
+        VideoProcessor.encode_frames(frames, output_path, fps, pix_fmt="bgr24")
+        
+    @staticmethod
+    def encode_frames(frames, output_path: str, fps: int = 25, pix_fmt: str = "rgb24"):
+        """
+        Encode frames to H.264 by piping raw pixels straight to ffmpeg
+        
+        Uses the best available encoder, preferring hardware (NVENC, VideoToolbox).
+        
+        Args:
+            frames: uint8 frames as a [T, H, W, 3] array or list of [H, W, 3] arrays
+            output_path: Output video path
+            fps: Frames per second
+            pix_fmt: Pixel layout of the frames ("rgb24" or "bgr24")
+        """
+        if len(frames) == 0:
+            raise ValueError("No frames to save")
+            
+        encoder = get_h264_encoder()
         height, width = frames[0].shape[:2]
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        # yuv420p needs even dimensions, so pad odd-sized frames by one pixel
+        pad_filter = ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"] if width % 2 or height % 2 else []
         
-        for frame in frames:
-            out.write(frame)
+        proc = subprocess.Popen(
+            [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error",
+             "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{width}x{height}", "-r", str(fps),
+             "-i", "pipe:", *pad_filter, "-c:v", encoder, *H264_ENCODERS[encoder],
+             "-pix_fmt", "yuv420p", output_path],
+            stdin=subprocess.PIPE
+        )
+        try:
+            if isinstance(frames, np.ndarray):
+                proc.stdin.write(memoryview(np.ascontiguousarray(frames)))
+            else:
+                for frame in frames:
+                    proc.stdin.write(memoryview(np.ascontiguousarray(frame)))
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
             
-        out.release()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {output_path}")
         
     @staticmethod
     def resize_frames(frames: List[np.ndarray], target_size: Tuple[int, int]) -> List[np.ndarray]:
@@ -74,9 +190,71 @@ class VideoProcessor:
             target_size: Target (width, height)
             
         Returns:
-            Resized frames
+            Resized frames, as views into one contiguous array
         """
-        return [cv2.resize(frame, target_size) for frame in frames]
+        if len(frames) == 0:
+            return []
+            
+        # Resize into one preallocated [T, th, tw, C] array instead of allocating per frame
+        target_width, target_height = target_size
+        out = np.empty((len(frames), target_height, target_width) + frames[0].shape[2:], dtype=frames[0].dtype)
+        for i, frame in enumerate(frames):
+            cv2.resize(frame, target_size, dst=out[i],
+                       interpolation=get_resize_interpolation(frame.shape, target_size))
+        return list(out)
+        
+    @staticmethod
+    def frames_to_array(frames: List[np.ndarray], dtype=np.float32) -> np.ndarray:
+        """
+        Stack frames into one preallocated [T, H, W, C] array
+        
+        Args:
+            frames: Input frames, all the same shape
+            dtype: Output dtype
+            
+        Returns:
+            Stacked frames
+        """
+        # np.stack only takes casting= from numpy 1.24, so fill (and cast) per frame
+        out = np.empty((len(frames),) + frames[0].shape, dtype=dtype)
+        for i, frame in enumerate(frames):
+            out[i] = frame
+        return out
+        
+    @staticmethod
+    def normalize_array(frames) -> np.ndarray:
+        """
+        Normalize pixel values to [0, 1] in a single batched pass
+        
+        Args:
+            frames: uint8 frames as a [T, H, W, C] array or list of [H, W, C] arrays
+            
+        Returns:
+            float32 array [T, H, W, C]
+        """
+        if isinstance(frames, np.ndarray):
+            arr = frames.astype(np.float32)
+        else:
+            arr = VideoProcessor.frames_to_array(frames, np.float32)
+        arr *= 1.0 / 255.0
+        return arr
+        
+    @staticmethod
+    def denormalize_array(frames) -> np.ndarray:
+        """
+        Denormalize pixel values from [0, 1] to [0, 255] in a single batched pass
+        
+        Args:
+            frames: Normalized frames as a [T, H, W, C] array or list of [H, W, C] arrays
+            
+        Returns:
+            uint8 array [T, H, W, C]
+        """
+        if not isinstance(frames, np.ndarray):
+            frames = VideoProcessor.frames_to_array(frames, np.float32)
+        scaled = np.multiply(frames, 255.0, dtype=np.float32)
+        np.clip(scaled, 0.0, 255.0, out=scaled)
+        return scaled.astype(np.uint8)
         
     @staticmethod
     def normalize_frames(frames: List[np.ndarray]) -> List[np.ndarray]:
@@ -87,9 +265,11 @@ class VideoProcessor:
             frames: Input frames
             
         Returns:
-            Normalized frames
+            Normalized frames, as views into one contiguous array
         """
-        return [frame.astype(np.float32) / 255.0 for frame in frames]
+        if len(frames) == 0:
+            return []
+        return list(VideoProcessor.normalize_array(frames))
         
     @staticmethod
     def denormalize_frames(frames: List[np.ndarray]) -> List[np.ndarray]:
@@ -100,39 +280,51 @@ class VideoProcessor:
             frames: Normalized frames
             
         Returns:
-            Denormalized frames
+            Denormalized frames, as views into one contiguous array
         """
-        return [(frame * 255).astype(np.uint8) for frame in frames]
+        if len(frames) == 0:
+            return []
+        return list(VideoProcessor.denormalize_array(frames))
 
 class ImageProcessor:
     """Utility class for image processing operations"""
     
     @staticmethod
-    def load_image(image_path: str) -> np.ndarray:
+    def load_image(image_path: str, color: str = "rgb") -> np.ndarray:
         """
         Load image from file
         
         Args:
             image_path: Path to image file
+            color: Channel order to return ("rgb", "bgr"); "bgr" skips the conversion
             
         Returns:
             Image as numpy array
         """
+        if color not in ("rgb", "bgr"):
+            raise ValueError(f"Unknown color order: {color}")
+            
         image = cv2.imread(image_path)
         if image is None:
             raise ValueError(f"Could not load image: {image_path}")
+        if color == "bgr":
+            return image
         return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         
     @staticmethod
-    def save_image(image: np.ndarray, output_path: str):
+    def save_image(image: np.ndarray, output_path: str, color: str = "rgb"):
         """
         Save image to file
         
         Args:
             image: Image as numpy array
             output_path: Output path
+            color: Channel order of image ("rgb", "bgr"); "bgr" skips the conversion
         """
-        image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        if color not in ("rgb", "bgr"):
+            raise ValueError(f"Unknown color order: {color}")
+            
+        image_bgr = image if color == "bgr" else cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
         cv2.imwrite(output_path, image_bgr)
         
     @staticmethod
@@ -147,19 +339,20 @@ class ImageProcessor:
         Returns:
             Resized image
         """
-        return cv2.resize(image, target_size)
+        return cv2.resize(image, target_size, interpolation=get_resize_interpolation(image.shape, target_size))
         
     @staticmethod
-    def center_crop(image: np.ndarray, crop_size: Tuple[int, int]) -> np.ndarray:
+    def center_crop(image: np.ndarray, crop_size: Tuple[int, int], contiguous: bool = False) -> np.ndarray:
         """
         Center crop image to specified size
         
         Args:
             image: Input image
             crop_size: Target crop (width, height)
+            contiguous: Copy the crop into a contiguous array (e.g. before torch.from_numpy)
             
         Returns:
-            Cropped image
+            Cropped image, as a view into image unless contiguous is set
         """
         height, width = image.shape[:2]
         crop_width, crop_height = crop_size
@@ -167,22 +360,63 @@ class ImageProcessor:
         start_x = (width - crop_width) // 2
         start_y = (height - crop_height) // 2
         
-        return image[start_y:start_y + crop_height, start_x:start_x + crop_width]
+        crop = image[start_y:start_y + crop_height, start_x:start_x + crop_width]
+        return np.ascontiguousarray(crop) if contiguous else crop
 
 class FileValidator:
     """Utility class for validating input files"""
     
+    @staticmethod
+    def _read_header(file_path: str, size: int = 12) -> bytes:
+        """Read the first bytes of a file for magic-number checks"""
+        try:
+            with open(file_path, 'rb') as f:
+                return f.read(size)
+        except OSError:
+            return b""
+            
+    @staticmethod
+    def _sniff_image(head: bytes) -> Optional[str]:
+        """Identify JPEG, PNG and WEBP files from their magic numbers"""
+        if head.startswith(b"\xff\xd8\xff"):
+            return "jpeg"
+        if head.startswith(b"\x89PNG"):
+            return "png"
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return "webp"
+        return None
+        
+    @staticmethod
+    def _sniff_video(head: bytes) -> Optional[str]:
+        """Identify MP4/MOV, AVI and Matroska/WebM files from their magic numbers"""
+        if head[4:8] == b"ftyp":
+            return "mp4"
+        if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+            return "avi"
+        if head.startswith(b"\x1a\x45\xdf\xa3"):
+            return "matroska"
+        return None
+        
     @staticmethod
     def is_valid_image(file_path: str) -> bool:
         """
         Check if file is a valid image
         
+        Known formats are recognized from their magic numbers without decoding;
+        anything else falls back to a PIL header check.
+        
         Args:
             file_path: Path to file
             
         Returns:
             True if valid image
         """
+        head = FileValidator._read_header(file_path)
+        if not head:
+            return False
+        if FileValidator._sniff_image(head) is not None:
+            return True
+            
         try:
             with Image.open(file_path) as img:
                 img.verify()
@@ -195,12 +429,21 @@ class FileValidator:
         """
         Check if file is a valid video
         
+        Known containers are recognized from their magic numbers without decoding;
+        anything else falls back to reading a frame with OpenCV.
+        
         Args:
             file_path: Path to file
             
         Returns:
             True if valid video
         """
+        head = FileValidator._read_header(file_path)
+        if not head:
+            return False
+        if FileValidator._sniff_video(head) is not None:
+            return True
+            
         try:
             cap = cv2.VideoCapture(file_path)
             ret, _ = cap.read()
@@ -279,18 +522,25 @@ class FormatConverter:
             fps: Output GIF FPS
         """
         frames = VideoProcessor.extract_frames(video_path)
-        
-        # Convert BGR to RGB and resize for GIF
-        rgb_frames = []
-        for frame in frames:
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            # Resize to reasonable GIF size
-            height, width = rgb_frame.shape[:2]
-            if max(width, height) > 512:
-                scale = 512 / max(width, height)
-                new_size = (int(width * scale), int(height * scale))
-                rgb_frame = cv2.resize(rgb_frame, new_size)
-            rgb_frames.append(rgb_frame)
+        if not frames:
+            raise ValueError(f"No frames could be extracted from video: {video_path}")
+            
+        # Decide the GIF size once; all frames of a video share it
+        height, width = frames[0].shape[:2]
+        if max(width, height) > 512:
+            scale = 512 / max(width, height)
+            width, height = int(width * scale), int(height * scale)
+            
+            # Downscale BGR frames straight into one preallocated array
+            bgr_frames = np.empty((len(frames), height, width, 3), dtype=np.uint8)
+            for i, frame in enumerate(frames):
+                cv2.resize(frame, (width, height), dst=bgr_frames[i], interpolation=cv2.INTER_AREA)
+        else:
+            bgr_frames = VideoProcessor.frames_to_array(frames, np.uint8)
+            
+        # Convert BGR to RGB for the whole clip in one call on a tall [T*h, w, 3] image
+        rgb_frames = cv2.cvtColor(bgr_frames.reshape(-1, width, 3), cv2.COLOR_BGR2RGB)
+        rgb_frames = list(rgb_frames.reshape(len(frames), height, width, 3))
             
         # Save as GIF
         imageio.mimsave(gif_path, rgb_frames, fps=fps, duration=1000/fps)
@@ -6,8 +6,11 @@ This script downloads and sets up all necessary model files
 
 import os
 import sys
-import urllib.request
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Tuple
+import requests
 from tqdm import tqdm
 
 # Model URLs (replace with actual URLs when available)
@@ -24,26 +27,125 @@ MODELS = {
     }
 }
 
-def download_file(url: str, filepath: str, description: str):
-    """Download a file with progress bar"""
+CHUNK_SIZE = 1 << 20
+NUM_CONNECTIONS = 8
+
+class RangeNotSupportedError(Exception):
+    """Raised when a server answers a ranged GET with the full body"""
+
+class IncompleteDownloadError(Exception):
+    """Raised when a response ends before all expected bytes were received"""
+
+def _download_range(url: str, fd: int, start: int, end: int, progress: tqdm, lock: threading.Lock):
+    """Download bytes [start, end] of url and write them at the same offset"""
+    headers = {"Range": f"bytes={start}-{end}"}
+    with requests.get(url, headers=headers, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise RangeNotSupportedError("server ignored the range request")
+            
+        offset = start
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+            with lock:
+                progress.update(len(chunk))
+                
+        # Older urllib3 ends the stream quietly on a dropped connection, which
+        # would leave a zero-filled hole in the preallocated file
+        if offset != end + 1:
+            raise IncompleteDownloadError(f"range {start}-{end} ended after {offset - start} bytes")
+
+def _download_parallel(url: str, filepath: str, total_size: int, num_connections: int, progress: tqdm):
+    """Download url with parallel range requests, each written in place into a preallocated file"""
+    range_size = -(-total_size // num_connections)
+    lock = threading.Lock()
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, total_size)
+        with ThreadPoolExecutor(max_workers=num_connections) as pool:
+            futures = [
+                pool.submit(_download_range, url, fd, start,
+                            min(start + range_size, total_size) - 1, progress, lock)
+                for start in range(0, total_size, range_size)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        os.close(fd)
+
+def _download_single(url: str, filepath: str, progress: tqdm):
+    """Download url over a single connection"""
+    with requests.get(url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        
+        # Content-Length counts encoded bytes, so only check unencoded bodies
+        expected_size = None
+        if response.headers.get("Content-Encoding", "identity") == "identity":
+            expected_size = int(response.headers.get("Content-Length", 0)) or None
+            
+        received = 0
+        with open(filepath, "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                received += len(chunk)
+                progress.update(len(chunk))
+                
+        if expected_size is not None and received != expected_size:
+            raise IncompleteDownloadError(f"received {received} of {expected_size} bytes")
+
+def _probe_download(url: str) -> Tuple[str, int, bool]:
+    """
+    Probe a download URL with a HEAD request
+    
+    Returns:
+        (final URL after redirects, size in bytes or 0 if unknown, whether byte ranges are supported)
+    """
+    try:
+        head = requests.head(url, allow_redirects=True, timeout=30)
+        head.raise_for_status()
+    except requests.RequestException:
+        # Some servers reject HEAD (e.g. 403/405); a plain GET may still work
+        return url, 0, False
+        
+    total_size = int(head.headers.get("Content-Length", 0))
+    supports_ranges = head.headers.get("Accept-Ranges") == "bytes"
+    return head.url, total_size, supports_ranges
+
+def download_file(url: str, filepath: str, description: str, num_connections: int = NUM_CONNECTIONS):
+    """Download a file with progress bar, using parallel range requests when supported"""
     print(f"Downloading {description}...")
     
     # Create directory if it doesn't exist
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     
-    def progress_hook(block_num, block_size, total_size):
-        if total_size > 0:
-            percent = min(100, (block_num * block_size * 100) // total_size)
-            bar_length = 50
-            filled_length = (percent * bar_length) // 100
-            bar = '█' * filled_length + '-' * (bar_length - filled_length)
-            print(f'\r[{bar}] {percent}% ({block_num * block_size}/{total_size} bytes)', end='')
+    # Download to a temporary file so a failed download never looks complete
+    part_path = filepath + ".part"
     
     try:
-        urllib.request.urlretrieve(url, filepath, reporthook=progress_hook)
-        print(f"\n✅ Successfully downloaded {description}")
+        url, total_size, supports_ranges = _probe_download(url)
+        
+        # Positional writes (os.pwrite) are not available on Windows
+        parallel = supports_ranges and total_size > 0 and hasattr(os, "pwrite")
+        
+        with tqdm(total=total_size or None, unit="B", unit_scale=True) as progress:
+            if parallel:
+                try:
+                    _download_parallel(url, part_path, total_size, num_connections, progress)
+                except RangeNotSupportedError:
+                    print("\n⚠️ Server ignored range requests, retrying over a single connection")
+                    progress.reset()
+                    parallel = False
+                    
+            if not parallel:
+                _download_single(url, part_path, progress)
+                
+        os.replace(part_path, filepath)
+        print(f"✅ Successfully downloaded {description}")
         return True
     except Exception as e:
+        if os.path.exists(part_path):
+            os.remove(part_path)
         print(f"\n❌ Failed to download {description}: {e}")
         return False
 
@@ -81,7 +183,7 @@ def main():
     else:
         print("⚠️ Some models failed to download. You may need to download them manually.")
         print("Visit the GitHub repository for manual download links.")
-    
+        
     return success_count == total_count
 
 if __name__ == "__main__":
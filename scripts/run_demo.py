@@ -7,13 +7,14 @@ Demonstrates motion transfer capabilities
 import os
 import sys
 import argparse
+import importlib.util
+import importlib.metadata
 from pathlib import Path
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from backend.inference.predictor import Motion3DPredictor
 from backend.models.model_loader import get_model_manager
 
 def main():
@@ -24,6 +25,8 @@ def main():
                        help="Model to use")
     parser.add_argument("--output", help="Output video path")
     parser.add_argument("--benchmark", action="store_true", help="Run benchmark")
+    parser.add_argument("--aot", action="store_true",
+                       help="AOT-compile the model for the benchmark clip (slow once per clip length)")
     parser.add_argument("--list-models", action="store_true", help="List available models")
     
     args = parser.parse_args()
@@ -48,7 +51,8 @@ def main():
     print(f"Selected model: {args.model}")
     print()
     
-    # Initialize predictor
+    # Initialize predictor; imported here so --list-models stays fast
+    from backend.inference.predictor import Motion3DPredictor
     try:
         predictor = Motion3DPredictor(args.model)
         print(f"✅ {args.model} model loaded successfully")
@@ -87,7 +91,7 @@ def main():
     # Run benchmark if requested
     if args.benchmark:
         print("🏃 Running benchmark...")
-        results = predictor.benchmark_performance(args.source, args.driving)
+        results = predictor.benchmark_performance(args.source, args.driving, aot_compile=args.aot)
         
         print(f"\n📊 Benchmark Results:")
         print(f"   Model: {results['model_name']}")
@@ -120,32 +124,26 @@ def main():
         return
 
 def check_dependencies():
-    """Check if required dependencies are installed"""
+    """Check if required dependencies are installed without importing them"""
+    # (module name, distribution name, display name)
+    dependencies = [
+        ("torch", "torch", "PyTorch"),
+        ("torchvision", "torchvision", "TorchVision"),
+        ("cv2", "opencv-python", "OpenCV"),
+        ("imageio", "imageio", "ImageIO")
+    ]
     missing = []
     
-    try:
-        import torch
-        print(f"✅ PyTorch {torch.__version__}")
-    except ImportError:
-        missing.append("torch")
-    
-    try:
-        import torchvision
-        print(f"✅ TorchVision {torchvision.__version__}")
-    except ImportError:
-        missing.append("torchvision")
-    
-    try:
-        import cv2
-        print(f"✅ OpenCV {cv2.__version__}")
-    except ImportError:
-        missing.append("opencv-python")
-    
-    try:
-        import imageio
-        print(f"✅ ImageIO {imageio.__version__}")
-    except ImportError:
-        missing.append("imageio")
+    for module_name, dist_name, display_name in dependencies:
+        if importlib.util.find_spec(module_name) is None:
+            missing.append(dist_name)
+            continue
+            
+        try:
+            version = importlib.metadata.version(dist_name)
+        except importlib.metadata.PackageNotFoundError:
+            version = "(installed)"
+        print(f"✅ {display_name} {version}")
     
     if missing:
         print(f"\n❌ Missing dependencies: {', '.join(missing)}")
@@ -0,0 +1,10 @@
+"""
+Shared pytest configuration for Motion3D Transformer tests
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path so tests can import the backend package
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+Tests for the API's prediction cache and task registry
+"""
+
+import io
+import os
+import time
+import asyncio
+
+import pytest
+from fastapi import UploadFile
+
+from backend.inference import api
+from backend.models.model_loader import ModelManager
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Empty prediction cache backed by a temporary directory"""
+    monkeypatch.setattr(api, "CACHE_DIR_P", tmp_path)
+    monkeypatch.setattr(api, "PREDICTION_CACHE", api.OrderedDict())
+    return tmp_path
+
+def write_file(path, mtime=None):
+    path.write_bytes(b"video")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+def test_load_prediction_cache_rebuilds_index_by_mtime(cache_dir, monkeypatch):
+    monkeypatch.setattr(api, "PREDICTION_CACHE_SIZE", 2)
+    now = time.time()
+    oldest = write_file(cache_dir / "a.mp4", now - 30)
+    middle = write_file(cache_dir / "b.mp4", now - 20)
+    newest = write_file(cache_dir / "c.mp4", now - 10)
+    
+    api.load_prediction_cache()
+    
+    # Entries beyond the cache size are evicted oldest first, files included
+    assert list(api.PREDICTION_CACHE) == ["b", "c"]
+    assert not oldest.exists()
+    assert middle.exists() and newest.exists()
+    assert api.get_cached_prediction("c") == str(newest)
+
+def test_cache_prediction_evicts_least_recently_used(cache_dir, tmp_path_factory, monkeypatch):
+    monkeypatch.setattr(api, "PREDICTION_CACHE_SIZE", 2)
+    output = write_file(tmp_path_factory.mktemp("results") / "out.mp4")
+    
+    asyncio.run(api.cache_prediction("a", str(output)))
+    asyncio.run(api.cache_prediction("b", str(output)))
+    # Touching "a" makes "b" the least recently used entry
+    assert api.get_cached_prediction("a") is not None
+    asyncio.run(api.cache_prediction("c", str(output)))
+    
+    assert list(api.PREDICTION_CACHE) == ["a", "c"]
+    assert not (cache_dir / "b.mp4").exists()
+    assert api.get_cached_prediction("b") is None
+
+def test_cached_prediction_missing_file_is_dropped(cache_dir):
+    api.PREDICTION_CACHE["gone"] = str(cache_dir / "gone.mp4")
+    
+    assert api.get_cached_prediction("gone") is None
+    assert "gone" not in api.PREDICTION_CACHE
+
+@pytest.fixture
+def checkpoints(monkeypatch):
+    """Checkpoint fingerprints by model name, editable by the test"""
+    fingerprints = {"motion_clone": "aaaa", "fomm": "bbbb"}
+    monkeypatch.setattr(ModelManager, "get_checkpoint_fingerprint", lambda self, name: fingerprints.get(name))
+    return fingerprints
+
+def test_prediction_cache_key_depends_on_all_inputs(checkpoints, monkeypatch):
+    key = api.get_prediction_cache_key("src", "drv", "motion_clone")
+    
+    assert key == api.get_prediction_cache_key("src", "drv", "motion_clone")
+    assert key != api.get_prediction_cache_key("src", "drv", "fomm")
+    assert key != api.get_prediction_cache_key("drv", "src", "motion_clone")
+    
+    # A new checkpoint or output format invalidates earlier videos
+    checkpoints["motion_clone"] = "cccc"
+    assert key != api.get_prediction_cache_key("src", "drv", "motion_clone")
+    checkpoints["motion_clone"] = "aaaa"
+    monkeypatch.setattr(api, "PREDICTION_FORMAT_VERSION", api.PREDICTION_FORMAT_VERSION + 1)
+    assert key != api.get_prediction_cache_key("src", "drv", "motion_clone")
+
+def test_prediction_cache_key_skips_models_without_checkpoint(checkpoints):
+    del checkpoints["fomm"]
+    
+    assert api.get_prediction_cache_key("src", "drv", "fomm") is None
+
+@pytest.fixture
+def tasks(tmp_path, monkeypatch):
+    """Empty task registry with results in a temporary directory"""
+    monkeypatch.setattr(api, "current_tasks", api.OrderedDict())
+    monkeypatch.setattr(api, "RESULTS_DIR", str(tmp_path))
+    monkeypatch.setattr(api, "MAX_TASKS", 2)
+    return tmp_path
+
+def test_set_task_evicts_oldest_tasks_and_their_files(tasks):
+    first_output = write_file(tasks / "first.mp4")
+    
+    async def run():
+        await api.set_task("first", {"status": "completed", "output_path": str(first_output)})
+        await api.set_task("second", {"status": "processing"})
+        # Re-setting a task marks it as most recent
+        await api.set_task("first", {"status": "completed", "output_path": str(first_output)})
+        await api.set_task("third", {"status": "processing"})
+        
+    asyncio.run(run())
+    
+    assert list(api.current_tasks) == ["first", "third"]
+    
+    asyncio.run(api.set_task("fourth", {"status": "processing"}))
+    assert list(api.current_tasks) == ["third", "fourth"]
+    assert not first_output.exists()
+
+def test_update_task_only_touches_known_tasks(tasks):
+    async def run():
+        await api.set_task("task", {"status": "processing", "progress": 0})
+        await api.update_task("task", progress=50)
+        await api.update_task("missing", progress=50)
+        
+    asyncio.run(run())
+    
+    assert api.current_tasks == {"task": {"status": "processing", "progress": 50}}
+
+def test_remove_stale_results_drops_old_files_and_tasks(tasks):
+    now = time.time()
+    stale = write_file(tasks / "stale.mp4", now - api.RESULT_TTL_SECONDS - 60)
+    fresh = write_file(tasks / "fresh.mp4", now)
+    (tasks / "cache").mkdir()
+    
+    async def run():
+        await api.set_task("stale", {"status": "completed", "output_path": os.path.join(str(tasks), "stale.mp4")})
+        await api.set_task("fresh", {"status": "completed", "output_path": os.path.join(str(tasks), "fresh.mp4")})
+        await api.remove_stale_results(now - api.RESULT_TTL_SECONDS)
+        
+    asyncio.run(run())
+    
+    assert not stale.exists()
+    assert fresh.exists()
+    assert (tasks / "cache").is_dir()
+    assert list(api.current_tasks) == ["fresh"]
+
+class SlowBenchmarkPredictor:
+    """Predictor stub whose benchmark reports the model active when it finishes"""
+    
+    def __init__(self):
+        self.model_name = "fomm"
+        
+    def switch_model(self, model_name):
+        self.model_name = model_name
+        
+    def benchmark_performance(self, test_image, test_video, num_runs=3):
+        time.sleep(0.2)
+        return {"avg_time_seconds": 1.0, "fps": 1.0, "model_name": self.model_name, "device": "cpu"}
+
+class AvailableModels:
+    """Model manager stub with every model's checkpoint present"""
+    device = "cpu"
+    
+    def get_available_models(self):
+        return {"motion_clone": "motion_clone.pth", "fomm": "fomm.pth"}
+
+@pytest.fixture
+def api_models(monkeypatch):
+    """API state after startup found both models, with no predictor created yet"""
+    monkeypatch.setattr(api, "model_manager", AvailableModels())
+    monkeypatch.setattr(api, "active_model_name", "fomm")
+    monkeypatch.setattr(api, "predictor", None)
+    monkeypatch.setattr(api, "_predictor_lock", asyncio.Lock())
+
+def test_model_switch_loads_nothing_in_api_process(api_models, monkeypatch):
+    monkeypatch.setattr(api, "Motion3DPredictor", None)
+    
+    asyncio.run(api.switch_model("motion_clone"))
+    
+    assert api.active_model_name == "motion_clone"
+    assert api.predictor is None
+    assert asyncio.run(api.get_current_model()) == {"model_name": "motion_clone", "device": "cpu"}
+
+def test_switch_does_not_disturb_running_benchmark(api_models, monkeypatch):
+    created = []
+    
+    def create_predictor(model_name):
+        created.append(model_name)
+        stub = SlowBenchmarkPredictor()
+        stub.model_name = model_name
+        return stub
+        
+    monkeypatch.setattr(api, "Motion3DPredictor", create_predictor)
+    
+    async def switch_later():
+        await asyncio.sleep(0.05)
+        return await api.switch_model("fomm")
+        
+    async def run():
+        return await asyncio.gather(
+            api.benchmark_model(
+                UploadFile(file=io.BytesIO(b"image"), filename="source.jpg"),
+                UploadFile(file=io.BytesIO(b"video"), filename="driving.mp4"),
+                model_name="motion_clone"
+            ),
+            switch_later()
+        )
+        
+    result, _ = asyncio.run(run())
+    
+    # The benchmark predictor is created lazily and keeps the model it was asked for
+    assert created == ["motion_clone"]
+    assert result.model_name == "motion_clone"
+    assert api.active_model_name == "fomm"
\ No newline at end of file
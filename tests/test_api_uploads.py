@@ -0,0 +1,89 @@
+"""
+Tests for upload size limits in the Motion3D API
+"""
+
+import io
+import asyncio
+
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from backend.inference import api
+
+@pytest.fixture
+def limited_client():
+    """App with a 1 KiB request limit and an upload endpoint that records calls"""
+    calls = []
+    app = FastAPI()
+    app.add_middleware(api.RequestSizeLimitMiddleware, max_bytes=1024)
+    
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        calls.append(file.filename)
+        return {"size": len(await file.read())}
+        
+    return TestClient(app), calls
+
+def test_small_upload_passes(limited_client):
+    client, calls = limited_client
+    response = client.post("/upload", files={"file": ("a.bin", b"x" * 100)})
+    
+    assert response.status_code == 200
+    assert response.json() == {"size": 100}
+    assert calls == ["a.bin"]
+
+def test_oversize_content_length_rejected_before_parsing(limited_client):
+    client, calls = limited_client
+    response = client.post("/upload", files={"file": ("a.bin", b"x" * 4096)})
+    
+    assert response.status_code == 413
+    assert calls == []
+
+def test_oversize_chunked_body_rejected_while_streaming(limited_client):
+    client, calls = limited_client
+    
+    def body():
+        for _ in range(8):
+            yield b"x" * 512
+            
+    response = client.post(
+        "/upload",
+        content=body(),
+        headers={"content-type": "multipart/form-data; boundary=b"}
+    )
+    
+    assert response.status_code == 413
+    assert calls == []
+
+def test_app_rejects_oversize_generate_request(monkeypatch):
+    monkeypatch.setattr(api, "MAX_REQUEST_BYTES", 1024)
+    
+    response = TestClient(api.app).post(
+        "/generate",
+        files={
+            "source_image": ("s.png", b"x" * 2048, "image/png"),
+            "driving_video": ("d.mp4", b"x" * 2048, "video/mp4")
+        }
+    )
+    assert response.status_code == 413
+
+def test_save_upload_rejects_oversize_file(tmp_path):
+    upload = UploadFile(file=io.BytesIO(b"x" * 100), filename="big.mp4")
+    path = tmp_path / "big.mp4"
+    
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(api.save_upload(upload, str(path), max_bytes=10))
+        
+    assert excinfo.value.status_code == 413
+    assert not path.exists()
+
+def test_save_upload_hashes_contents(tmp_path):
+    upload = UploadFile(file=io.BytesIO(b"hello"), filename="ok.png")
+    path = tmp_path / "ok.png"
+    
+    first = asyncio.run(api.save_upload(upload, str(path)))
+    second = asyncio.run(api.save_upload(UploadFile(file=io.BytesIO(b"hello"), filename="ok.png"), str(path)))
+    
+    assert path.read_bytes() == b"hello"
+    assert first == second
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Tests for the parallel model downloader
+"""
+
+import os
+import threading
+import importlib.util
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "download_models", Path(__file__).parent.parent / "scripts" / "download_models.py"
+)
+download_models = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(download_models)
+
+PAYLOAD = bytes(range(256)) * 4096
+
+class FileHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD, optionally rejecting HEAD or ignoring Range headers"""
+    head_status = 200
+    honor_range = True
+    truncate = False
+    
+    def log_message(self, *args):
+        pass
+        
+    def do_HEAD(self):
+        self.send_response(self.head_status)
+        self.send_header("Content-Length", str(len(PAYLOAD)) if self.head_status == 200 else "0")
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        if range_header and self.honor_range:
+            start, end = (int(v) for v in range_header.split("=")[1].split("-"))
+            body = PAYLOAD[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        else:
+            body = PAYLOAD
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        # A dropped connection: the declared length is never delivered
+        self.wfile.write(body[:len(body) // 2] if self.truncate else body)
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Start a local server with the given handler settings and return its URL"""
+    servers = []
+    
+    def start(head_status=200, honor_range=True, truncate=False):
+        handler = type("Handler", (FileHandler,), {
+            "head_status": head_status, "honor_range": honor_range, "truncate": truncate
+        })
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/model.pth"
+        
+    yield start
+    for server in servers:
+        server.shutdown()
+
+@pytest.mark.parametrize("head_status,honor_range", [(200, True), (405, True), (403, True), (200, False)])
+def test_download_falls_back_to_single_connection(serve, tmp_path, head_status, honor_range):
+    url = serve(head_status, honor_range)
+    path = tmp_path / "models" / "model.pth"
+    
+    assert download_models.download_file(url, str(path), "test model")
+    assert path.read_bytes() == PAYLOAD
+    assert not (tmp_path / "models" / "model.pth.part").exists()
+
+def test_download_without_pwrite_uses_single_connection(serve, tmp_path, monkeypatch):
+    url = serve()
+    monkeypatch.delattr(os, "pwrite")
+    path = tmp_path / "model.pth"
+    
+    assert download_models.download_file(url, str(path), "test model")
+    assert path.read_bytes() == PAYLOAD
+
+@pytest.mark.parametrize("head_status", [200, 405])
+def test_truncated_download_is_not_kept(serve, tmp_path, head_status):
+    url = serve(head_status, truncate=True)
+    path = tmp_path / "model.pth"
+    
+    assert not download_models.download_file(url, str(path), "test model")
+    assert not path.exists()
+    assert not (tmp_path / "model.pth.part").exists()
+
+class ShortResponse:
+    """Response whose stream ends early without an error, as with urllib3 1.x"""
+    status_code = 206
+    headers = {"Content-Length": "100"}
+    
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *args):
+        pass
+        
+    def raise_for_status(self):
+        pass
+        
+    def iter_content(self, chunk_size):
+        yield b"x" * 10
+
+def test_short_range_is_detected(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_models.requests, "get", lambda *args, **kwargs: ShortResponse())
+    fd = os.open(tmp_path / "model.part", os.O_WRONLY | os.O_CREAT)
+    try:
+        with pytest.raises(download_models.IncompleteDownloadError):
+            download_models._download_range("http://host/model.pth", fd, 0, 99,
+                                            download_models.tqdm(disable=True), threading.Lock())
+    finally:
+        os.close(fd)
+
+def test_short_single_download_is_detected(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_models.requests, "get", lambda *args, **kwargs: ShortResponse())
+    
+    with pytest.raises(download_models.IncompleteDownloadError):
+        download_models._download_single("http://host/model.pth", str(tmp_path / "model.part"),
+                                         download_models.tqdm(disable=True))
\ No newline at end of file
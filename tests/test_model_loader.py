@@ -0,0 +1,57 @@
+"""
+Tests for ModelManager checkpoint loading and saving
+"""
+
+import os
+
+import pytest
+import torch
+
+from backend.models.model_loader import ModelManager
+from backend.models.motion_clone import MotionClonePredictor
+
+CONFIG = {"image_size": 256, "num_channels": 3, "latent_dim": 256, "num_heads": 8}
+
+def test_async_checkpoint_stores_shared_weights_once(tmp_path):
+    manager = ModelManager(device="cpu")
+    manager.loaded_models["motion_clone"] = MotionClonePredictor(CONFIG)
+    path = str(tmp_path / "checkpoint.pth")
+    
+    manager.save_checkpoint_async("motion_clone", path)
+    manager.wait_checkpoints()
+    
+    state_dict = torch.load(path, map_location="cpu")["model_state_dict"]
+    motion_weight = state_dict["motion_encoder.backbone.conv_layers.0.weight"]
+    appearance_weight = state_dict["appearance_encoder.backbone.conv_layers.0.weight"]
+    assert motion_weight.data_ptr() == appearance_weight.data_ptr()
+    
+    # The file holds each unique parameter once
+    unique_bytes = sum(p.numel() * p.element_size() for p in manager.loaded_models["motion_clone"].parameters())
+    assert os.path.getsize(path) < unique_bytes * 1.1
+
+def test_async_checkpoint_is_a_snapshot(tmp_path):
+    manager = ModelManager(device="cpu")
+    model = MotionClonePredictor(CONFIG)
+    manager.loaded_models["motion_clone"] = model
+    expected = model.decoder.deconv_layers[0].weight.detach().clone()
+    path = str(tmp_path / "checkpoint.pth")
+    
+    future = manager.save_checkpoint_async("motion_clone", path)
+    with torch.no_grad():
+        model.decoder.deconv_layers[0].weight.add_(1.0)
+    future.result()
+    
+    saved = torch.load(path, map_location="cpu")["model_state_dict"]["decoder.deconv_layers.0.weight"]
+    torch.testing.assert_close(saved, expected)
+
+def test_load_model_rechecks_checkpoint_behind_availability_cache(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint.pth"
+    checkpoint.write_bytes(b"weights")
+    monkeypatch.setattr(ModelManager, "_get_default_model_path", lambda self, name: str(checkpoint))
+    manager = ModelManager(device="cpu")
+    assert "motion_clone" in manager.get_available_models()
+    
+    # Deleted within the cache TTL: loading must fail rather than fall back to random weights
+    checkpoint.unlink()
+    with pytest.raises(FileNotFoundError):
+        manager.load_model("motion_clone")
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Tests for MotionClone checkpoint compatibility
+"""
+
+import torch
+
+from backend.models.motion_clone import MotionClonePredictor
+
+CONFIG = {"image_size": 256, "num_channels": 3, "latent_dim": 256, "num_heads": 8}
+
+def legacy_state_dict(model: MotionClonePredictor, same_encoders: bool):
+    """Build a state dict in the pre-shared-backbone layout"""
+    state_dict = {}
+    for key, value in model.state_dict().items():
+        if ".backbone." in key:
+            key = key.replace(".backbone.", ".")
+            if key.startswith("motion_encoder.") and not same_encoders:
+                value = value + 1.0
+        state_dict[key] = value.clone()
+    return state_dict
+
+def test_backbone_is_shared():
+    model = MotionClonePredictor(CONFIG)
+    
+    assert model.motion_encoder.backbone is model.appearance_encoder.backbone
+
+def test_legacy_checkpoint_with_equal_encoders_stays_shared():
+    model = MotionClonePredictor(CONFIG)
+    model.load_state_dict(legacy_state_dict(MotionClonePredictor(CONFIG), same_encoders=True))
+    
+    assert model.motion_encoder.backbone is model.appearance_encoder.backbone
+
+def test_legacy_checkpoint_with_different_encoders_keeps_both(capsys):
+    source = MotionClonePredictor(CONFIG)
+    state_dict = legacy_state_dict(source, same_encoders=False)
+    
+    model = MotionClonePredictor(CONFIG)
+    model.load_state_dict(state_dict)
+    
+    assert model.motion_encoder.backbone is not model.appearance_encoder.backbone
+    assert "separate backbones" in capsys.readouterr().out
+    torch.testing.assert_close(
+        model.motion_encoder.backbone.conv_layers[0].weight, state_dict["motion_encoder.conv_layers.0.weight"]
+    )
+    torch.testing.assert_close(
+        model.appearance_encoder.backbone.conv_layers[0].weight, state_dict["appearance_encoder.conv_layers.0.weight"]
+    )
+
+def test_forward_matches_out_of_place_decoder():
+    torch.manual_seed(0)
+    model = MotionClonePredictor(CONFIG).eval()
+    
+    for batch_size, num_frames in [(1, 1), (1, 3), (2, 3)]:
+        source = torch.rand(batch_size, 3, 64, 64)
+        driving = torch.rand(batch_size, num_frames, 3, 64, 64)
+        
+        output = model(source, driving)
+        
+        with torch.no_grad():
+            expected = []
+            for t in range(num_frames):
+                motion = model.temporal_attention(
+                    model.motion_encoder(driving.flatten(0, 1)).unflatten(0, (batch_size, num_frames))
+                )[:, t]
+                expected.append(model.decoder(model.appearance_encoder(source), motion))
+            expected = torch.stack(expected, dim=1)
+            
+        assert output.shape == (batch_size, num_frames, 3, 64, 64)
+        torch.testing.assert_close(output, expected, rtol=1e-4, atol=1e-5)
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+Tests for Motion3DPredictor preprocessing
+"""
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+import torch
+
+from backend.inference import predictor as predictor_module
+from backend.inference.predictor import Motion3DPredictor
+from backend.models.model_loader import ModelManager
+from backend.models.motion_clone import MotionClonePredictor
+from backend.utils.video_processing import VideoProcessor
+
+CONFIG = {"image_size": 256, "num_channels": 3, "latent_dim": 256, "num_heads": 8}
+
+@pytest.fixture(scope="module")
+def predictor(tmp_path_factory):
+    """CPU predictor backed by a freshly initialized MotionClone checkpoint"""
+    checkpoint = tmp_path_factory.mktemp("models") / "checkpoint.pth"
+    torch.save({"model_state_dict": MotionClonePredictor(CONFIG).state_dict()}, checkpoint)
+    
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(ModelManager, "_get_default_model_path", lambda self, name: str(checkpoint))
+        yield Motion3DPredictor("motion_clone", device="cpu")
+
+def write_video(path, frames):
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 25, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+def test_preprocess_video_reads_all_frames(predictor, tmp_path):
+    frames = [np.full((48, 64, 3), i * 40, dtype=np.uint8) for i in range(5)]
+    path = tmp_path / "clip.mp4"
+    write_video(path, frames)
+    
+    video = predictor.preprocess_video(str(path), max_frames=3)
+    
+    assert video.shape == (1, 3, 3, 256, 256)
+    # Frames are decoded in order into the buffer, not left uninitialized
+    means = video[0].mean(dim=(1, 2, 3))
+    assert means[0] < means[1] < means[2]
+
+def test_preprocess_video_uses_decoded_frame_size(predictor, tmp_path, monkeypatch):
+    frames = [np.full((48, 64, 3), 200, dtype=np.uint8) for _ in range(2)]
+    path = tmp_path / "clip.mp4"
+    write_video(path, frames)
+    
+    # Simulate a container whose reported size doesn't match the decoded frames
+    real_capture = cv2.VideoCapture
+    
+    class RotatedCapture:
+        def __init__(self, *args):
+            self.cap = real_capture(*args)
+            
+        def get(self, prop):
+            if prop == cv2.CAP_PROP_FRAME_WIDTH:
+                return 48
+            if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+                return 64
+            return self.cap.get(prop)
+            
+        def read(self):
+            return self.cap.read()
+            
+        def release(self):
+            self.cap.release()
+            
+    monkeypatch.setattr(cv2, "VideoCapture", RotatedCapture)
+    video = predictor.preprocess_video(str(path))
+    
+    assert video.shape[:2] == (1, 2)
+    # 200 / 127.5 - 1, up to codec rounding
+    assert abs(video.mean().item() - (200 / 127.5 - 1)) < 0.05
+
+@pytest.mark.parametrize("max_frames,expected", [(100, 6), (4, 4)])
+def test_preprocess_video_reads_past_underreported_frame_count(predictor, tmp_path, monkeypatch,
+                                                              max_frames, expected):
+    frames = [np.full((48, 64, 3), i * 40, dtype=np.uint8) for i in range(6)]
+    path = tmp_path / "clip.mp4"
+    write_video(path, frames)
+    
+    # Simulate a container whose frame count estimate is too low
+    real_capture = cv2.VideoCapture
+    
+    class UnderCountingCapture:
+        def __init__(self, *args):
+            self.cap = real_capture(*args)
+            
+        def get(self, prop):
+            if prop == cv2.CAP_PROP_FRAME_COUNT:
+                return 2
+            return self.cap.get(prop)
+            
+        def read(self):
+            return self.cap.read()
+            
+        def release(self):
+            self.cap.release()
+            
+    monkeypatch.setattr(cv2, "VideoCapture", UnderCountingCapture)
+    video = predictor.preprocess_video(str(path), max_frames=max_frames)
+    
+    assert video.shape[:2] == (1, expected)
+    # Frames decoded before the buffer grew are kept in order
+    means = video[0].mean(dim=(1, 2, 3))
+    assert all(means[i] < means[i + 1] for i in range(expected - 1))
+
+def test_preprocess_image(predictor, tmp_path):
+    path = tmp_path / "source.png"
+    Image.fromarray(np.zeros((40, 30, 3), dtype=np.uint8)).save(path)
+    
+    image = predictor.preprocess_image(str(path))
+    
+    assert image.shape == (1, 3, 256, 256)
+    assert image.min().item() == -1.0
+
+class FakeFrame:
+    def __init__(self, data):
+        self.data = data
+
+class FakeDecoder:
+    """torchcodec VideoDecoder stand-in for a 2 frame clip with no frame count"""
+    
+    class metadata:
+        num_frames = None
+        
+    def __init__(self, path, device):
+        pass
+        
+    def get_frame_at(self, index):
+        if index >= 2:
+            raise IndexError("Index out of bounds")
+        return FakeFrame(torch.full((3, 48, 64), 100 * index, dtype=torch.uint8))
+        
+    def get_frames_in_range(self, start, stop):
+        raise AssertionError("Range was requested without a known frame count")
+
+def test_cuda_decode_stops_at_end_of_short_clip(predictor, monkeypatch):
+    monkeypatch.setattr(predictor_module, "VideoDecoder", FakeDecoder)
+    
+    video = predictor._decode_video_cuda("clip.mp4", max_frames=100)
+    
+    assert video.shape == (2, 3, 48, 64)
+    assert video[1].float().mean().item() == 100
+
+def test_cuda_decode_failure_falls_back_to_opencv(predictor, tmp_path, monkeypatch):
+    frames = [np.full((48, 64, 3), 200, dtype=np.uint8) for _ in range(3)]
+    path = tmp_path / "clip.mp4"
+    write_video(path, frames)
+    
+    class BrokenDecoder:
+        def __init__(self, path, device):
+            raise RuntimeError("Unsupported device: cuda")
+            
+    # Pretend to run on CUDA with a torchcodec build that can't decode there
+    monkeypatch.setattr(predictor_module, "VideoDecoder", BrokenDecoder)
+    monkeypatch.setattr(predictor, "device", "cuda")
+    monkeypatch.setattr(predictor, "_to_device", lambda tensor: tensor)
+    
+    video = predictor.preprocess_video(str(path))
+    
+    assert video.shape == (1, 3, 3, 256, 256)
+
+def test_resize_in_chunks_matches_single_pass(predictor, monkeypatch):
+    frames = torch.randint(0, 256, (5, 3, 40, 60), dtype=torch.uint8)
+    expected = torch.nn.functional.interpolate(frames.float(), size=(256, 256), mode="bilinear",
+                                               align_corners=False, antialias=True) / 127.5 - 1.0
+                                               
+    # Two frames' worth of pixels per chunk, so the last chunk is partial
+    monkeypatch.setattr(predictor_module, "RESIZE_CHUNK_PIXELS", 2 * 40 * 60)
+    resized = predictor._resize_and_normalize(frames)
+    
+    assert resized.shape == (5, 3, 256, 256)
+    assert resized.is_contiguous(memory_format=torch.channels_last)
+    torch.testing.assert_close(resized, expected)
+
+@pytest.mark.parametrize("model_name,output,expected", [
+    # MotionClone ends in a sigmoid, so its output is already in [0, 1]
+    ("motion_clone", 0.0, 0),
+    ("motion_clone", 0.5, 127),
+    ("motion_clone", 1.0, 255),
+    # FOMM outputs logits
+    ("fomm", 0.0, 127),
+    ("fomm", 20.0, 255)
+])
+def test_save_output_video_maps_model_range_to_pixels(predictor, monkeypatch, model_name, output, expected):
+    encoded = []
+    monkeypatch.setattr(VideoProcessor, "encode_frames",
+                        lambda frames, path, fps=25: encoded.append(frames))
+    monkeypatch.setattr(predictor, "model_name", model_name)
+    
+    predictor._save_output_video(torch.full((1, 2, 3, 8, 8), output), "out.mp4")
+    
+    assert encoded[0].shape == (2, 8, 8, 3)
+    assert (encoded[0] == expected).all()
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Tests for the fused TemporalAttention module in MotionClone
+"""
+
+import pytest
+import torch
+import torch.nn as nn
+
+from backend.models import motion_clone
+from backend.models.motion_clone import TemporalAttention
+
+CONFIG = {"latent_dim": 256, "num_heads": 8}
+
+@pytest.fixture
+def legacy_pair():
+    """A legacy nn.MultiheadAttention and a TemporalAttention loaded from its weights"""
+    torch.manual_seed(0)
+    legacy = nn.MultiheadAttention(embed_dim=256, num_heads=8, batch_first=True).eval()
+    state_dict = {f"attention.{key}": value for key, value in legacy.state_dict().items()}
+    
+    attention = TemporalAttention(CONFIG).eval()
+    attention.load_state_dict(state_dict)
+    return legacy, attention
+
+def test_legacy_weights_match_multihead_attention(legacy_pair):
+    legacy, attention = legacy_pair
+    x = torch.randn(2, 5, 256)
+    
+    with torch.no_grad():
+        expected, _ = legacy(x, x, x)
+        actual = attention(x)
+        
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
+
+def test_feature_maps_attend_over_time_per_location(legacy_pair):
+    legacy, attention = legacy_pair
+    x = torch.randn(2, 4, 256, 3, 2)
+    
+    with torch.no_grad():
+        actual = attention(x)
+        # Reference: run each spatial location's [T, C] sequence independently
+        sequences = x.permute(0, 3, 4, 1, 2).reshape(-1, 4, 256)
+        expected, _ = legacy(sequences, sequences, sequences)
+        expected = expected.view(2, 3, 2, 4, 256).permute(0, 3, 4, 1, 2)
+        
+    assert actual.shape == x.shape
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
+
+def test_reference_attention_matches_fused_kernel():
+    q, k, v = (torch.randn(3, 8, 5, 32) for _ in range(3))
+    
+    expected = torch.nn.functional.scaled_dot_product_attention(q, k, v)
+    actual = motion_clone._scaled_dot_product_attention(q, k, v)
+    
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
+
+def test_fallback_used_without_fused_kernel(legacy_pair, monkeypatch):
+    legacy, attention = legacy_pair
+    x = torch.randn(1, 6, 256)
+    monkeypatch.delattr(motion_clone.F, "scaled_dot_product_attention")
+    
+    with torch.no_grad():
+        expected, _ = legacy(x, x, x)
+        actual = attention(x)
+        
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Tests for video, image and file validation utilities
+"""
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend.utils.video_processing import (
+    FileValidator, FormatConverter, ImageProcessor, VideoProcessor,
+    get_h264_encoder, get_resize_interpolation, H264_ENCODERS
+)
+
+def test_encoder_probe_returns_known_encoder():
+    assert get_h264_encoder() in H264_ENCODERS
+
+@pytest.mark.parametrize("width,height", [(64, 48), (33, 31)])
+def test_encode_frames_handles_any_frame_size(tmp_path, width, height):
+    frames = np.random.randint(0, 255, (5, height, width, 3), dtype=np.uint8)
+    output_path = str(tmp_path / "out.mp4")
+    
+    VideoProcessor.encode_frames(frames, output_path, fps=25)
+    
+    cap = cv2.VideoCapture(output_path)
+    ret, frame = cap.read()
+    cap.release()
+    assert ret
+    # Odd sizes are padded up to the next even size
+    assert frame.shape[:2] == (height + height % 2, width + width % 2)
+
+def test_frames_to_video_accepts_odd_sizes(tmp_path):
+    frames = [np.zeros((31, 33, 3), dtype=np.uint8) for _ in range(3)]
+    output_path = str(tmp_path / "out.mp4")
+    
+    FormatConverter.frames_to_video(frames, output_path)
+    
+    assert (tmp_path / "out.mp4").stat().st_size > 0
+
+@pytest.mark.parametrize("head,expected", [
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n\x00\x00\x00\r", "png"),
+    (b"RIFF\x24\x00\x00\x00WEBP", "webp"),
+    (b"RIFF\x24\x00\x00\x00AVI ", None),
+    (b"GIF89a\x01\x00\x01\x00\x00\x00", None),
+    (b"", None)
+])
+def test_sniff_image(head, expected):
+    assert FileValidator._sniff_image(head) == expected
+
+@pytest.mark.parametrize("head,expected", [
+    (b"\x00\x00\x00\x18ftypmp42", "mp4"),
+    (b"\x00\x00\x00\x14ftypqt  ", "mp4"),
+    (b"RIFF\x24\x00\x00\x00AVI ", "avi"),
+    (b"\x1a\x45\xdf\xa3\x01\x00\x00\x00\x00\x00\x00\x1f", "matroska"),
+    (b"RIFF\x24\x00\x00\x00WEBP", None),
+    (b"\x00\x00\x00\x08wide", None)
+])
+def test_sniff_video(head, expected):
+    assert FileValidator._sniff_video(head) == expected
+
+def test_validators_use_magic_bytes_and_fall_back(tmp_path):
+    png = tmp_path / "image.png"
+    Image.fromarray(np.zeros((4, 4, 3), dtype=np.uint8)).save(png)
+    gif = tmp_path / "image.gif"
+    Image.fromarray(np.zeros((4, 4, 3), dtype=np.uint8)).save(gif)
+    junk = tmp_path / "junk.bin"
+    junk.write_bytes(b"not a media file")
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    
+    assert FileValidator.is_valid_image(str(png))
+    # GIF has no fast-path signature and goes through PIL
+    assert FileValidator.is_valid_image(str(gif))
+    assert not FileValidator.is_valid_image(str(junk))
+    assert not FileValidator.is_valid_image(str(empty))
+    assert not FileValidator.is_valid_image(str(tmp_path / "missing.png"))
+    assert not FileValidator.is_valid_video(str(junk))
+    assert not FileValidator.is_valid_video(str(empty))
+
+def test_validator_accepts_encoded_video(tmp_path):
+    path = str(tmp_path / "clip.mp4")
+    VideoProcessor.encode_frames(np.zeros((2, 16, 16, 3), dtype=np.uint8), path)
+    
+    assert FileValidator.is_valid_video(path)
+
+@pytest.mark.parametrize("shape,target,expected", [
+    ((480, 640, 3), (320, 240), cv2.INTER_AREA),
+    ((480, 640), (320, 240), cv2.INTER_AREA),
+    ((240, 320, 3), (640, 480), cv2.INTER_LINEAR),
+    ((256, 256, 3), (256, 256), cv2.INTER_LINEAR),
+    # Fewer output pixels overall counts as a downscale
+    ((100, 400, 3), (300, 120), cv2.INTER_AREA)
+])
+def test_resize_interpolation(shape, target, expected):
+    assert get_resize_interpolation(shape, target) == expected
+
+def test_resize_image_and_center_crop():
+    image = np.arange(8 * 10 * 3, dtype=np.uint8).reshape(8, 10, 3)
+    
+    assert ImageProcessor.resize_image(image, (5, 4)).shape == (4, 5, 3)
+    
+    crop = ImageProcessor.center_crop(image, (4, 2))
+    assert crop.shape == (2, 4, 3)
+    assert np.shares_memory(crop, image)
+    np.testing.assert_array_equal(crop, image[3:5, 3:7])
+    
+    contiguous = ImageProcessor.center_crop(image, (4, 2), contiguous=True)
+    assert contiguous.flags["C_CONTIGUOUS"]
+    assert not np.shares_memory(contiguous, image)
\ No newline at end of file